@@ -0,0 +1,66 @@
+import queue
+import threading
+import time
+
+
+class LoadCancelled(Exception):
+    pass
+
+
+class BackgroundLoader:
+    """
+    Runs a loading function on a worker thread.
+
+    The worker must not touch Tk widgets; it reports back through messages
+    that the UI collects with poll() from a root.after callback. A message is
+    a tuple whose first item is its kind: whatever the target reports, then
+    ("done",), ("cancelled",) or ("error", exception) when the target ends.
+    """
+
+    def __init__(self, target):
+        self.target = target
+        self.started = None
+        self._messages = queue.Queue()
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self.target(self)
+        except LoadCancelled:
+            self.report("cancelled")
+        except Exception as e:
+            self.report("error", e)
+        else:
+            self.report("done")
+
+    def report(self, kind, *payload):
+        self._messages.put((kind,) + payload)
+
+    def progress(self, done, total, unit):
+        """Reports progress and stops the worker if it has been cancelled."""
+        if self._cancelled.is_set():
+            raise LoadCancelled
+        self.report("progress", done, total, unit)
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def is_running(self):
+        return self._thread.is_alive()
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def poll(self):
+        """Returns the messages reported since the last poll."""
+        messages = []
+        while True:
+            try:
+                messages.append(self._messages.get_nowait())
+            except queue.Empty:
+                return messages
@@ -0,0 +1,109 @@
+import hashlib
+import os
+import pickle
+import zlib
+
+from util import atomic_write
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "plnnstudy")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+SUFFIX = ".bank"
+# Bump whenever the pickled question structure changes
+FORMAT_VERSION = 3
+
+
+def read_entry(path):
+    """
+    Returns the value stored in path by write_entry, or None if the file is
+    missing, unreadable or corrupt.
+    """
+    try:
+        with open(path, "rb") as f:
+            return pickle.loads(zlib.decompress(f.read()))
+    except (OSError, zlib.error, pickle.UnpicklingError, EOFError, ValueError):
+        return None
+
+
+def write_entry(path, value):
+    """
+    Stores value in path as a zlib-compressed pickle, replacing the file in
+    one step. Cache files are only an optimisation, so a failed write is
+    not an error; returns whether value was written.
+    """
+    data = zlib.compress(pickle.dumps(value, pickle.HIGHEST_PROTOCOL), 1)
+    try:
+        with atomic_write(path) as f:
+            f.write(data)
+    except OSError:
+        return False
+    return True
+
+
+class QuestionCache:
+    """
+    On-disk cache of parsed question banks.
+
+    Entries are keyed by the source file's content hash and mtime, so editing
+    the file simply makes its old entry unreachable. Each entry is a
+    zlib-compressed pickle of (sheet_names, all_questions); all_questions may
+    hold only the sheets parsed so far. The directory is kept under max_bytes
+    by evicting the least recently used entries.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or os.environ.get(
+            "PLNN_CACHE_DIR", DEFAULT_CACHE_DIR
+        )
+        self.max_bytes = max_bytes
+
+    def key(self, file_path):
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        digest.update(str(os.stat(file_path).st_mtime_ns).encode())
+        digest.update(str(FORMAT_VERSION).encode())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def get(self, key):
+        """
+        Returns the cached (sheet_names, all_questions) for a key, or None.
+        """
+        path = self._path(key)
+        entry = read_entry(path)
+        if entry is not None:
+            try:
+                os.utime(path)  # Mark as recently used
+            except OSError:
+                pass
+        return entry
+
+    def put(self, key, sheet_names, all_questions):
+        path = self._path(key)
+        if write_entry(path, (list(sheet_names), dict(all_questions))):
+            self.evict(keep=path)
+
+    def evict(self, keep=None):
+        """Removes least recently used entries until the cache fits max_bytes."""
+        entries = []
+        try:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(SUFFIX):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            return  # Removed by another process; eviction can wait
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
@@ -0,0 +1,265 @@
+"""
+Columnar question bank files that are read through mmap.
+
+Usage:
+    python bank_file.py export SOURCE OUTPUT.qbank   # a file or a directory
+    python bank_file.py info BANK.qbank
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from collections.abc import Mapping, Sequence
+
+from question import Question
+from util import atomic_write
+
+SUFFIX = ".qbank"
+MAGIC = b"PLNNBANK"
+VERSION = 1
+# magic, version, sheets, questions, strings, answers
+HEADER = struct.Struct("<8sIIIII")
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def _layout(sheets, questions, strings, answers):
+    """
+    Returns the (offset, size) of each section after the header, in file
+    order: sheet starts, question strings, answer starts, answers, ids,
+    string offsets, then the text blob. Every section starts 8-byte aligned.
+    """
+    sizes = [
+        4 * (sheets + 1),
+        4 * (questions + 1),
+        4 * (questions + 1),
+        2 * answers,
+        8 * questions,
+        8 * (strings + 1),
+    ]
+    sections = []
+    offset = _align(HEADER.size)
+    for size in sizes:
+        sections.append((offset, size))
+        offset = _align(offset + size)
+    sections.append((offset, None))
+    return sections
+
+
+def write_bank(path, all_questions):
+    """
+    Writes {sheet: questions} to a bank file.
+
+    All text goes into one UTF-8 blob; string offsets, each question's
+    first string and its correct answers live in flat arrays. String i of
+    the blob is sheet name i for the first len(all_questions) strings;
+    after them each question's text is followed by its choices. Choices
+    that are not text, e.g. numbers from a spreadsheet, are stored as text.
+    """
+    if sys.byteorder != "little":
+        raise OSError("Bank files can only be written on little-endian machines")
+    sheet_starts = array("I", [0])
+    question_strings = array("I")
+    answer_starts = array("I", [0])
+    answers = array("H")
+    ids = bytearray()
+    string_offsets = array("Q", [0])
+    blob = bytearray()
+
+    def add_string(value):
+        blob.extend(str(value).encode())
+        string_offsets.append(len(blob))
+
+    for sheet in all_questions:
+        add_string(sheet)
+    for questions in all_questions.values():
+        for q in questions:
+            question_strings.append(len(string_offsets) - 1)
+            add_string(q.question)
+            for choice in q.choices:
+                add_string(choice)
+            answers.extend(q.correct_answers)
+            answer_starts.append(len(answers))
+            ids += q.id
+        sheet_starts.append(len(question_strings))
+    question_strings.append(len(string_offsets) - 1)
+
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        len(all_questions),
+        len(question_strings) - 1,
+        len(string_offsets) - 1,
+        len(answers),
+    )
+    sections = [
+        sheet_starts,
+        question_strings,
+        answer_starts,
+        answers,
+        ids,
+        string_offsets,
+        blob,
+    ]
+    layout = _layout(
+        len(all_questions), len(ids) // 8, len(string_offsets) - 1, len(answers)
+    )
+    with atomic_write(path) as f:
+        f.write(header)
+        for (offset, _), section in zip(layout, sections):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(section)
+
+
+class MappedBank(Mapping):
+    """
+    Sheet name -> questions mapping over a memory-mapped bank file.
+
+    Opening only reads the header and the sheet names; the arrays are
+    memoryviews straight into the mapping, and a Question is built from
+    them when it is looked up, decoding just its own strings. The pages are
+    shared through the page cache by every process that maps the file.
+
+    Args:
+        path (str): Path to a file written by write_bank.
+
+    Raises:
+        ValueError: If the file is not a bank file of this version.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if sys.byteorder != "little":
+            raise OSError("Bank files can only be read on little-endian machines")
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, sheets, questions, strings, answers = (
+                HEADER.unpack_from(self._mmap)
+            )
+        except struct.error:
+            magic = version = None
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError(f"Not a version {VERSION} bank file: {path}")
+
+        view = memoryview(self._mmap)
+        self._views = [view]
+        layout = _layout(sheets, questions, strings, answers)
+        arrays = []
+        for (offset, size), fmt in zip(layout, "IIIHBQ"):
+            arrays.append(view[offset : offset + size].cast(fmt))
+        (
+            self._sheet_starts,
+            self._question_strings,
+            self._answer_starts,
+            self._answers,
+            self._ids,
+            self._string_offsets,
+        ) = arrays
+        self._blob = view[layout[-1][0] :]
+        self._views += arrays + [self._blob]
+        self._sheet_names = [self._string(i) for i in range(sheets)]
+        self._sheet_index = {sheet: i for i, sheet in enumerate(self._sheet_names)}
+
+    def _string(self, i):
+        offsets = self._string_offsets
+        return str(self._blob[offsets[i] : offsets[i + 1]], "utf-8")
+
+    def question(self, i):
+        """Builds question i of the whole bank, counting across sheets."""
+        first, last = self._question_strings[i], self._question_strings[i + 1]
+        q = Question(
+            self._string(first),
+            [self._string(s) for s in range(first + 1, last)],
+            self._answers[self._answer_starts[i] : self._answer_starts[i + 1]],
+        )
+        q._id = bytes(self._ids[8 * i : 8 * i + 8])
+        return q
+
+    def __getitem__(self, sheet):
+        i = self._sheet_index[sheet]
+        return MappedSheet(self, self._sheet_starts[i], self._sheet_starts[i + 1])
+
+    def __iter__(self):
+        return iter(self._sheet_names)
+
+    def __len__(self):
+        return len(self._sheet_names)
+
+    def question_count(self):
+        return len(self._question_strings) - 1
+
+    def close(self):
+        # The mapping can only be closed once no memoryview points into it
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+
+class MappedSheet(Sequence):
+    """The questions of one sheet of a MappedBank, built on lookup."""
+
+    def __init__(self, bank, start, stop):
+        self.bank = bank
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            indices = range(*i.indices(len(self)))
+            return [self.bank.question(self.start + j) for j in indices]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("question index out of range")
+        return self.bank.question(self.start + i)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="write a bank file")
+    export_parser.add_argument("source", help="xlsx, docx or PDF file, or directory")
+    export_parser.add_argument("output")
+    info_parser = commands.add_parser("info", help="describe a bank file")
+    info_parser.add_argument("bank")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        from library import Library, parse_bank
+
+        if os.path.isdir(args.source):
+            library = Library(args.source)
+            library.scan()
+            all_questions = library.catalogue()
+        else:
+            all_questions = parse_bank(args.source)
+        write_bank(args.output, all_questions)
+        print(
+            f"Wrote {sum(map(len, all_questions.values()))} questions in"
+            f" {len(all_questions)} sheets to {args.output}"
+            f" ({os.path.getsize(args.output) / 1e6:.1f} MB)"
+        )
+    else:
+        start = time.perf_counter()
+        bank = MappedBank(args.bank)
+        elapsed = time.perf_counter() - start
+        print(f"Opened in {elapsed * 1000:.2f} ms: {bank.question_count()} questions")
+        for sheet in bank:
+            print(f"  {sheet}: {len(bank[sheet])}")
+        bank.close()
+
+
+if __name__ == "__main__":
+    main()
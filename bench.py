@@ -0,0 +1,1036 @@
+"""
+Benchmarks for the quiz loaders and engine.
+
+Usage:
+    python bench.py            # run every benchmark
+    python bench.py load ...   # run only the named benchmarks
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import PatternFill
+
+from bank_cache import QuestionCache
+from bank_file import MappedBank, write_bank
+from dedup import QuestionIndex
+from docx_loader import iter_word_questions, load_word_document
+from history import AttemptLog
+from library import Library
+from pdf_loader import CHOICE_LETTERS, extract_questions, load_pdf_questions
+from question import Question
+from quiz_engine import (
+    QuizSession,
+    select_questions,
+    stratified_sample,
+    weighted_sample,
+)
+from scheduler import DAY, ReviewStore, Scheduler
+from search import SearchIndex, fold, tokenize
+from xlsx_loader import (
+    PARALLEL_MIN_BYTES,
+    is_highlighted,
+    iter_sheet_rows,
+    load_workbook_questions,
+)
+
+HIGHLIGHT = PatternFill(start_color="FFCFE2F3", end_color="FFCFE2F3", fill_type="solid")
+
+
+def make_workbook(path, sheets, questions_per_sheet, choices=4):
+    """Writes a synthetic question bank in the same layout as plnn.xlsx."""
+    wb = Workbook()
+    wb.remove(wb.active)
+    for s in range(sheets):
+        ws = wb.create_sheet(f"Bài {s + 1}")
+        ws.append(["STT", "Câu hỏi", "Đáp án"])
+        for q in range(questions_per_sheet):
+            for c in range(choices):
+                ws.append(
+                    [
+                        q + 1 if c == 0 else None,
+                        f"Câu hỏi số {q + 1} của sheet {s + 1}?" if c == 0 else None,
+                        f"Đáp án {c + 1} cho câu {q + 1}",
+                    ]
+                )
+                if c == q % choices:
+                    ws.cell(row=ws.max_row, column=3).fill = HIGHLIGHT
+    wb.save(path)
+
+
+def timed(fn, *args, repeat=3):
+    """Returns the best wall time of `repeat` calls, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_load(tmpdir):
+    print("-- load: single-pass workbook loader")
+    print(f"{'sheets':>8} {'questions':>10} {'MB':>8} {'seconds':>10}")
+
+    def run(sheets, per_sheet):
+        path = os.path.join(tmpdir, f"load_{sheets}_{per_sheet}.xlsx")
+        make_workbook(path, sheets, per_sheet)
+        seconds = timed(load_workbook_questions, path)
+        size = os.path.getsize(path) / 1e6
+        print(f"{sheets:>8} {sheets * per_sheet:>10} {size:>8.2f} {seconds:>10.3f}")
+
+    # Growing file size at a fixed sheet count should scale linearly...
+    for per_sheet in (500, 1000, 2000, 4000):
+        run(5, per_sheet)
+    # ...and the same total spread over more sheets should stay flat.
+    for sheets in (1, 10, 30, 50):
+        run(sheets, 10000 // sheets)
+
+
+def bench_lazy(tmpdir):
+    print("-- lazy: time until the first sheet is ready")
+    print(f"{'sheets':>8} {'eager s':>10} {'lazy s':>10}")
+
+    def first_sheet(path):
+        bank = load_workbook_questions(path, lazy=True)
+        questions = bank[next(iter(bank))]
+        bank.close()
+        return questions
+
+    for sheets in (10, 25, 50):
+        path = os.path.join(tmpdir, f"lazy_{sheets}.xlsx")
+        make_workbook(path, sheets, 200)
+        eager = timed(load_workbook_questions, path)
+        lazy = timed(first_sheet, path)
+        print(f"{sheets:>8} {eager:>10.3f} {lazy:>10.3f}")
+
+
+def bench_cache(tmpdir):
+    print("-- cache: cold parse vs. cached load")
+    print(f"{'questions':>10} {'parse s':>10} {'cached s':>10}")
+    cache = QuestionCache(os.path.join(tmpdir, "cache"))
+    for per_sheet in (1000, 4000):
+        path = os.path.join(tmpdir, f"cache_{per_sheet}.xlsx")
+        make_workbook(path, 5, per_sheet)
+        parse = timed(load_workbook_questions, path)
+        load_workbook_questions(path, cache=cache)
+        cached = timed(load_workbook_questions, path, False, cache)
+        print(f"{5 * per_sheet:>10} {parse:>10.3f} {cached:>10.3f}")
+
+
+def bench_fill(tmpdir):
+    print("-- fill: per-cell fill proxies vs. style table mask")
+    path = os.path.join(tmpdir, "fill.xlsx")
+    make_workbook(path, 1, 5000)
+
+    def per_cell(ws):
+        return [
+            is_highlighted(row[2].fill)
+            for row in ws.iter_rows(min_row=2, max_col=3)
+        ]
+
+    def style_table(ws):
+        return [row[3] for row in iter_sheet_rows(ws)]
+
+    print(f"{'mode':>10} {'per-cell s':>12} {'mask s':>10}")
+    for read_only in (False, True):
+        wb = load_workbook(path, read_only=read_only, data_only=True)
+        ws = wb.worksheets[0]
+        assert per_cell(ws) == style_table(ws)
+        slow = timed(per_cell, ws)
+        fast = timed(style_table, ws)
+        mode = "read-only" if read_only else "full"
+        print(f"{mode:>10} {slow:>12.3f} {fast:>10.3f}")
+        wb.close()
+
+
+def peak_rss_mb(code):
+    """Runs code in a fresh interpreter and returns its peak RSS in MB."""
+    # VmHWM starts afresh at exec, unlike ru_maxrss which a child inherits
+    script = (
+        code
+        + "\nprint([l for l in open('/proc/self/status') if l.startswith('VmHWM')][0])"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    return int(out.stdout.split()[-2]) / 1024  # VmHWM is reported in kB
+
+
+def bench_memory(tmpdir):
+    print("-- memory: peak RSS while reading one large sheet")
+    path = os.path.join(tmpdir, "memory.xlsx")
+    make_workbook(path, 1, 25000)
+    modes = {
+        "baseline": "import xlsx_loader",
+        "full": f"import xlsx_loader\nxlsx_loader.load_workbook_questions({path!r})",
+        "low_memory": (
+            "import xlsx_loader\n"
+            f"xlsx_loader.load_workbook_questions({path!r}, low_memory=True)"
+        ),
+        "stream": (
+            "import xlsx_loader\n"
+            f"for q in xlsx_loader.iter_workbook_questions({path!r}, 'Bài 1'): pass"
+        ),
+    }
+    print(f"{'mode':>12} {'peak MB':>10}")
+    for mode, code in modes.items():
+        print(f"{mode:>12} {peak_rss_mb(code):>10.1f}")
+
+
+def bench_parallel(tmpdir):
+    print(f"-- parallel: 40-sheet bank on {os.cpu_count()} CPUs")
+    path = os.path.join(tmpdir, "parallel.xlsx")
+    make_workbook(path, 40, 1500)
+    # Smaller files are always parsed serially, whatever workers is
+    assert os.path.getsize(path) >= PARALLEL_MIN_BYTES, os.path.getsize(path)
+    serial = load_workbook_questions(path, workers=1)
+    print(f"{'workers':>8} {'seconds':>10}")
+    for workers in (1, 2, 4, 8):
+        assert load_workbook_questions(path, workers=workers) == serial
+        seconds = timed(load_workbook_questions, path, False, None, False, workers)
+        print(f"{workers:>8} {seconds:>10.3f}")
+
+
+def bench_render(tmpdir):
+    print("-- render: Next latency in the Tk front end")
+    import random
+    import tkinter
+
+    import quiz3
+
+    try:
+        root = tkinter.Tk()
+    except tkinter.TclError:
+        print("skipped: no display")
+        return
+    app = quiz3.QuizApp(root)
+    questions = [
+        Question(
+            f"Câu hỏi {i}? " * (1 + i % 5),
+            [f"Đáp án {c} " * (1 + i % 3) for c in range(2 + i % 4)],
+            [0],
+        )
+        for i in range(1000)
+    ]
+    laid_out = app.prerender_next
+
+    def quiz(prerender):
+        # Without prerendering, the hidden panel is never filled and Next lays
+        # the question out in the shown one
+        app.prerender_next = laid_out if prerender else lambda session: None
+        app.session = QuizSession(
+            questions, shuffle_choices=True, rng=random.Random(0)
+        )
+        app.display_question()
+        root.update_idletasks()
+        latencies = []
+        while True:
+            app.options_var.set("0")
+            app.submit_answer()
+            root.update_idletasks()  # Draws the feedback, then runs idle tasks
+            start = time.perf_counter()
+            app.next_question()
+            root.update_idletasks()
+            latencies.append(time.perf_counter() - start)
+            if app.session.finished():
+                return latencies
+            i = app.session.index
+            expected = f"Q{i + 1}: {app.session.current().question}"
+            assert app.panel.question_label.cget("text") == expected
+            shown = app.panel.option_rows[: app.panel.shown_options]
+            assert [rb.cget("text") for _, _, rb in shown] == list(
+                app.session.shown_choices()
+            )
+
+    print(f"{'mode':>10} {'p50 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+    for prerender in (False, True):
+        latencies = sorted(quiz(prerender))
+        mode = "swap" if prerender else "lay out"
+        print(
+            f"{mode:>10}"
+            f" {latencies[len(latencies) // 2] * 1000:>10.2f}"
+            f" {latencies[len(latencies) * 99 // 100] * 1000:>10.2f}"
+            f" {latencies[-1] * 1000:>10.2f}"
+        )
+    app.on_close()
+
+
+def synthetic_questions(count, build):
+    """
+    Builds count questions with build(question, choices, correct_answers).
+
+    Like a real bank, many choices repeat across questions ("Đúng", "Sai",
+    ...), but each parsed string is a separate object.
+    """
+    common = ["Đúng", "Sai", "Tất cả các đáp án trên", "Không có đáp án nào đúng"]
+    return [
+        build(
+            f"Câu hỏi số {i}: nhận định nào sau đây là đúng?",
+            ["".join(common[(i + c) % 4]) for c in range(2)]
+            + [f"Phương án {c} của câu {i}" for c in range(2)],
+            [i % 4],
+        )
+        for i in range(count)
+    ]
+
+
+def bench_records(tmpdir):
+    print("-- records: memory of 100k questions")
+
+    def as_dict(question, choices, correct_answers):
+        return {
+            "question": question,
+            "choices": choices,
+            "correct_answer": correct_answers[0],
+        }
+
+    print(f"{'record':>10} {'MB':>8}")
+    for name, build in (("dict", as_dict), ("Question", Question)):
+        tracemalloc.start()
+        questions = synthetic_questions(100000, build)
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del questions
+        print(f"{name:>10} {size / 1e6:>8.1f}")
+
+
+def bench_dedup(tmpdir):
+    print("-- dedup: 20k questions copied into 5 sheets, 1% with other answers")
+
+    def parse_sheets():
+        # Fresh objects and strings per sheet, as separate parses produce
+        sheets = {}
+        for s in range(5):
+            questions = []
+            for i, q in enumerate(synthetic_questions(20000, Question)):
+                answers = [(i + s) % 4] if i % 100 == 0 else q.correct_answers
+                choices = ["".join(choice) for choice in q.choices]
+                questions.append(Question("".join(q.question), choices, answers))
+            sheets[f"Sheet{s}"] = questions
+        return sheets
+
+    def index_all(sheets, index):
+        return {
+            sheet: index.add(questions, "bank.xlsx", sheet)
+            for sheet, questions in sheets.items()
+        }
+
+    sheets = parse_sheets()
+    index = QuestionIndex()
+    elapsed = timed(index_all, sheets, index, repeat=1)
+    print(f"index 100k questions: {elapsed:.3f} s; {index.summary()}")
+
+    print(f"{'':>10} {'MB':>8}")
+    for name in ("plain", "indexed"):
+        tracemalloc.start()
+        sheets = parse_sheets()
+        if name == "indexed":
+            sheets = index_all(sheets, QuestionIndex())
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{name:>10} {size / 1e6:>8.1f}")
+        del sheets
+
+
+def python_docx_questions(path):
+    """The docx parser quiz3.py used before docx_loader, kept as a reference."""
+    from docx import Document
+    from docx.oxml.ns import qn
+
+    def has_shading_or_highlight(run):
+        if run.font.highlight_color is not None:
+            return True
+        return run._element.rPr is not None and (
+            run._element.rPr.find(qn("w:shd")) is not None
+        )
+
+    questions = []
+    current_question = None
+    choices = []
+    correct_answers = []
+    bool_ques = False
+    for para in Document(path).paragraphs:
+        if all(run.bold for run in para.runs):
+            if bool_ques:
+                questions.append(Question(current_question, choices, correct_answers))
+                current_question = None
+                choices = []
+                correct_answers = []
+                bool_ques = False
+            if current_question is None:
+                current_question = para.text.strip()
+            else:
+                current_question += "\n" + para.text.strip()
+        else:
+            bool_ques = True
+            if any(has_shading_or_highlight(run) for run in para.runs):
+                correct_answers.append(len(choices))
+            choices.append(para.text.strip())
+    if current_question:
+        questions.append(Question(current_question, choices, correct_answers))
+    return questions
+
+
+def make_document(path, questions, choices=4, styled=False):
+    """
+    Writes a synthetic docx bank in the same layout as plnn2.docx.
+
+    With styled, questions are bold and correct answers highlighted through
+    a paragraph and a character style instead of direct formatting.
+    """
+    from docx import Document
+    from docx.enum.style import WD_STYLE_TYPE
+    from docx.enum.text import WD_COLOR_INDEX
+
+    doc = Document()
+    if styled:
+        question_style = doc.styles.add_style("Question", WD_STYLE_TYPE.PARAGRAPH)
+        question_style.font.bold = True
+        answer_style = doc.styles.add_style("Answer", WD_STYLE_TYPE.CHARACTER)
+        answer_style.font.highlight_color = WD_COLOR_INDEX.YELLOW
+    for q in range(questions):
+        text = f"{q + 1}. Câu hỏi số {q + 1}?"
+        if styled:
+            doc.add_paragraph(text, style="Question")
+        else:
+            doc.add_paragraph().add_run(text).bold = True
+        for c in range(choices):
+            run = doc.add_paragraph().add_run(f"Đáp án {c + 1} của câu {q + 1}")
+            if c == q % choices:
+                if styled:
+                    run.style = "Answer"
+                else:
+                    run.font.highlight_color = WD_COLOR_INDEX.YELLOW
+    doc.save(path)
+
+
+def bench_docx(tmpdir):
+    print("-- docx: python-docx vs. streaming parser")
+    assert load_word_document("plnn2.docx") == python_docx_questions("plnn2.docx")
+    print("plnn2.docx: outputs identical")
+
+    print(
+        f"{'questions':>10} {'docx s':>10} {'stream s':>10}"
+        f" {'docx MB':>10} {'stream MB':>10}"
+    )
+    for questions in (1000, 5000):
+        path = os.path.join(tmpdir, f"bank_{questions}.docx")
+        make_document(path, questions)
+        assert load_word_document(path) == python_docx_questions(path)
+        old = timed(python_docx_questions, path, repeat=1)
+        new = timed(load_word_document, path, repeat=1)
+        old_mb = peak_rss_mb(
+            f"import bench\nbench.python_docx_questions({path!r})"
+        )
+        new_mb = peak_rss_mb(
+            f"import bench\nfor q in bench.iter_word_questions({path!r}): pass"
+        )
+        print(
+            f"{questions:>10} {old:>10.3f} {new:>10.3f} {old_mb:>10.1f} {new_mb:>10.1f}"
+        )
+
+
+def bench_styles(tmpdir):
+    print("-- styles: direct formatting vs. formatting from styles")
+    print(f"{'questions':>10} {'direct s':>10} {'styled s':>10}")
+    for questions in (1000, 5000):
+        direct = os.path.join(tmpdir, f"direct_{questions}.docx")
+        styled = os.path.join(tmpdir, f"styled_{questions}.docx")
+        make_document(direct, questions)
+        make_document(styled, questions, styled=True)
+        questions_found = load_word_document(styled)
+        assert questions_found == load_word_document(direct)
+        assert len(questions_found) == questions
+        old = timed(load_word_document, direct, repeat=1)
+        new = timed(load_word_document, styled, repeat=1)
+        print(f"{questions:>10} {old:>10.3f} {new:>10.3f}")
+
+
+def make_pdf(path, questions, choices=4):
+    """
+    Writes a synthetic quiz review PDF, about 4 questions per A4 page.
+
+    The text flows from page to page, so some questions and choices are
+    split across page breaks.
+    """
+    import io
+
+    import pymupdf
+
+    parts = []
+    for q in range(questions):
+        parts.append(f"<p>Câu Hỏi {q + 1}: Nội dung câu hỏi số {q + 1}?</p>")
+        parts.append("<p>Chọn câu:</p>")
+        for c in range(choices):
+            parts.append(f"<p>{'abcdefgh'[c]}. PA{q + 1}_{c + 1}</p>")
+        parts.append(f"<p>Câu trả lời đúng là: PA{q + 1}_{q % choices + 1}</p>")
+    story = pymupdf.Story("".join(parts))
+    buffer = io.BytesIO()
+    writer = pymupdf.DocumentWriter(buffer)
+    page_rect = pymupdf.paper_rect("a4")
+    more = True
+    while more:
+        device = writer.begin_page(page_rect)
+        more, _ = story.place(page_rect + (36, 36, -36, -36))
+        story.draw(device)
+        writer.end_page()
+    writer.close()
+    with open(path, "wb") as f:
+        f.write(buffer.getvalue())
+
+
+def concatenated_pdf_questions(path):
+    """The old pipeline: one growing string for the whole document."""
+    import pymupdf
+
+    doc = pymupdf.open(path)
+    text = ""
+    for page_num in range(doc.page_count):
+        text += doc.load_page(page_num).get_text("text")
+    return extract_questions(text.split("\n"))
+
+
+def bench_pdf(tmpdir):
+    print("-- pdf: concatenated text vs. streamed pages")
+    import pymupdf
+
+    questions = 4200
+    path = os.path.join(tmpdir, "bank.pdf")
+    make_pdf(path, questions)
+    with pymupdf.open(path) as doc:
+        print(f"{doc.page_count} pages, {questions} questions")
+
+    expected = concatenated_pdf_questions(path)
+    assert len(expected) == questions
+    assert all(len(q.choices) == 4 and q.correct_answers for q in expected)
+    print(f"{'pipeline':>16} {'s':>10}")
+    elapsed = timed(concatenated_pdf_questions, path, repeat=1)
+    print(f"{'concatenated':>16} {elapsed:>10.3f}")
+    for workers in (1, 2, 4, 8):
+        assert load_pdf_questions(path, workers) == expected
+        elapsed = timed(load_pdf_questions, path, workers, repeat=1)
+        print(f"{f'{workers} workers':>16} {elapsed:>10.3f}")
+
+
+def answer_lines(questions, choices=8, answers=4):
+    """Lines of a multi-select bank; every answer line names several choices."""
+    for q in range(questions):
+        yield f"Câu Hỏi {q + 1}"
+        for c in range(choices):
+            yield f"{CHOICE_LETTERS[c]}. Phương án {c + 1}, câu {q + 1}"
+        names = ", ".join(
+            f"Phương án {(q + a) % choices + 1}, câu {q + 1}" for a in range(answers)
+        )
+        yield f"The correct answers are: {names}"
+
+
+def bench_answers(tmpdir):
+    print("-- answers: multi-select answer resolution")
+    print(f"{'questions':>10} {'s':>10} {'us/question':>12}")
+    for questions in (10_000, 100_000):
+        lines = list(answer_lines(questions))
+        diagnostics = []
+        parsed = extract_questions(lines, diagnostics)
+        assert len(parsed) == questions and not diagnostics
+        assert all(len(q.correct_answers) == 4 for q in parsed)
+        elapsed = timed(extract_questions, lines, repeat=1)
+        print(f"{questions:>10} {elapsed:>10.3f} {elapsed / questions * 1e6:>12.1f}")
+
+
+def play_session(questions, rng, rounds=3):
+    """Answers a quiz at random, then up to rounds - 1 retries, headlessly."""
+    session = QuizSession(
+        questions, shuffle_questions=True, shuffle_choices=True, rng=rng
+    )
+    answers = 0
+    for _ in range(rounds):
+        while not session.finished():
+            choices = len(session.current().choices)
+            session.submit(rng.randrange(choices) if choices else None)
+            session.next()
+            answers += 1
+        # Questions without a marked answer can never be retried away
+        if not session.retry_incorrect():
+            break
+    return answers
+
+
+def bench_session(tmpdir):
+    print("-- session: headless quiz sessions on plnn.xlsx")
+    import random
+
+    all_questions = load_workbook_questions("plnn.xlsx")
+    sheet = max(all_questions, key=lambda name: len(all_questions[name]))
+    bank = all_questions[sheet]
+    rng = random.Random(0)
+    print(f"{'sessions':>10} {'answers':>10} {'s':>10} {'us/answer':>10}")
+    for sessions in (100, 1000):
+        start = time.perf_counter()
+        answers = 0
+        for _ in range(sessions):
+            selected = select_questions(bank, count=50, shuffle=True, rng=rng)
+            answers += play_session(selected, rng)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{sessions:>10} {answers:>10} {elapsed:>10.3f}"
+            f" {elapsed / answers * 1e6:>10.2f}"
+        )
+
+
+def slice_and_sample(questions, start, end, count, rng):
+    """How start_quiz picked questions before select_questions sampled."""
+    selected = questions[start:end]
+    selected = rng.sample(selected, len(selected))
+    return selected[:count]
+
+
+def bench_sampling(tmpdir):
+    print("-- sampling: 50 questions from a 200k-question bank")
+    import random
+    from collections import Counter
+
+    bank = synthetic_questions(200000, Question)
+    path = os.path.join(tmpdir, "sampling.qbank")
+    write_bank(path, {"Bank": bank})
+    mapped = MappedBank(path)["Bank"]
+    rng = random.Random(0)
+
+    def quiz(questions, copy):
+        if copy:
+            return list(slice_and_sample(questions, 0, None, 50, rng))
+        return list(select_questions(questions, count=50, shuffle=True, rng=rng))
+
+    print(f"{'bank':>8} {'old ms':>10} {'new ms':>10}")
+    for name, questions in (("list", bank), ("mmap", mapped)):
+        old = timed(quiz, questions, True, repeat=1 if name == "mmap" else 3)
+        new = timed(quiz, questions, False)
+        print(f"{name:>8} {old * 1000:>10.2f} {new * 1000:>10.3f}")
+
+    first = select_questions(bank, 1000, 5000, 50, rng=random.Random(7))
+    again = select_questions(mapped, 1000, 5000, 50, rng=random.Random(7))
+    assert [q.id for q in first] == [q.id for q in again]
+
+    # Every question of a range is equally likely to be drawn
+    draws = Counter()
+    for _ in range(20000):
+        draws.update(select_questions(range(100), 10, 20, 3, rng=rng))
+    expected = 20000 * 3 / 10
+    assert all(abs(n - expected) < 0.05 * expected for n in draws.values()), draws
+
+    sheets = {f"Sheet{s}": bank[: 1000 * (s + 1)] for s in range(10)}
+    start = time.perf_counter()
+    pairs = stratified_sample(sheets, 55, rng=rng)
+    elapsed = time.perf_counter() - start
+    counts = Counter(sheet for sheet, _ in pairs)
+    assert [counts[f"Sheet{s}"] for s in range(10)] == list(range(1, 11))
+    print(f"stratified 55 across 10 sheets: {elapsed * 1000:.3f} ms")
+
+
+def concatenated_weighted_sample(sheets, weights, count, rng):
+    """Mixes sheets by copying them into one list and keying every question."""
+    combined = [
+        (sheet, q) for sheet in weights for q in sheets[sheet] if weights[sheet] > 0
+    ]
+    keys = [rng.random() ** (1 / weights[sheet]) for sheet, _ in combined]
+    top = sorted(range(len(combined)), key=keys.__getitem__, reverse=True)[:count]
+    return [combined[i] for i in top]
+
+
+def bench_mix(tmpdir):
+    print("-- mix: 50 questions from 10 weighted sheets of 100k questions")
+    import random
+    from collections import Counter
+
+    bank = synthetic_questions(100000, Question)
+    sheets = {f"Sheet{s}": bank for s in range(10)}
+    weights = {sheet: s + 1 for s, sheet in enumerate(sheets)}
+    rng = random.Random(0)
+
+    old = timed(concatenated_weighted_sample, sheets, weights, 50, rng, repeat=1)
+    new = timed(weighted_sample, sheets, weights, 50, rng)
+    print(f"concatenate and key: {old * 1000:>10.1f} ms")
+    print(f"alias table:         {new * 1000:>10.3f} ms")
+
+    # start_mix and QuizServer.mix_sheets draw every question by default
+    whole = dict(list(sheets.items())[:3])
+    equal = dict.fromkeys(whole, 1)
+    everything = timed(weighted_sample, whole, equal, 300000, rng, repeat=1)
+    print(f"all 300k questions:  {everything * 1000:>10.1f} ms")
+    pairs = weighted_sample(whole, equal, 300000, rng)
+    assert Counter(sheet for sheet, _ in pairs) == dict.fromkeys(whole, 100000)
+    for sheet in whole:
+        drawn = [q for s, q in pairs if s == sheet]
+        assert len({id(q) for q in drawn}) == 100000
+
+    # Each sheet is drawn in proportion to its weight times its size
+    draws = Counter()
+    for _ in range(2000):
+        draws.update(sheet for sheet, _ in weighted_sample(sheets, weights, 50, rng))
+    total = sum(draws.values())
+    for s, sheet in enumerate(sheets):
+        share = draws[sheet] / total
+        assert abs(share - (s + 1) / 55) < 0.05 * (s + 1) / 55, (sheet, share)
+
+    small = {"a": bank[:10], "b": bank[10:1000]}
+    pairs = weighted_sample(small, {"a": 100, "b": 1}, 500, rng)
+    assert len({q.id for _, q in pairs}) == 500
+    assert sum(sheet == "a" for sheet, _ in pairs) == 10
+
+
+def layout(number, question, choices, width=80):
+    """Stands in for the Tk layout work: wraps the question and choices."""
+    import textwrap
+
+    lines = textwrap.wrap(f"Q{number}: {question}", width)
+    for i, choice in enumerate(choices):
+        lines += textwrap.wrap(f"{chr(65 + i)}. {choice}", width)
+    return lines
+
+
+def bench_prefetch(tmpdir):
+    print("-- prefetch: Next latency with the next question laid out early")
+    import random
+
+    def quiz(length, prefetch, seed=0):
+        rng = random.Random(seed)
+        questions = [
+            Question(
+                f"Câu {i}: " + "nhận định nào sau đây là đúng " * length,
+                [f"Phương án {c} " + "của câu hỏi " * length for c in range(4)],
+                [i % 4],
+            )
+            for i in range(200)
+        ]
+        session = QuizSession(questions, shuffle_choices=True, rng=rng)
+        shown = [layout(1, questions[0].question, session.shown_choices())]
+        slowest = 0.0
+        while True:
+            session.submit(rng.randrange(4))
+            prepared = None
+            if prefetch:
+                upcoming = session.prefetch()
+                if upcoming is not None:
+                    index, q, choices = upcoming
+                    prepared = layout(index + 1, q.question, choices)
+            start = time.perf_counter()  # Next pressed
+            q = session.next()
+            if q is None:
+                break
+            if prepared is None:
+                choices = session.shown_choices()
+                prepared = layout(session.index + 1, q.question, choices)
+            shown.append(prepared)
+            slowest = max(slowest, time.perf_counter() - start)
+        return shown, slowest
+
+    print(f"{'chars':>8} {'plain ms':>10} {'prefetch ms':>12}")
+    for length in (1, 10, 100):
+        plain, plain_next = quiz(length, False)
+        prefetched, prefetched_next = quiz(length, True)
+        assert plain == prefetched
+        chars = len(" ".join(plain[0]))
+        print(
+            f"{chars:>8} {plain_next * 1000:>10.3f} {prefetched_next * 1000:>12.3f}"
+        )
+
+
+def bench_server(tmpdir):
+    print("-- server: concurrent sessions against the HTTP server")
+    import asyncio
+
+    from quiz_server import QuizServer, load_bank, run_load
+
+    async def run(users):
+        server = QuizServer(load_bank("plnn.xlsx"))
+        listener = await server.start("127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            result = await run_load("127.0.0.1", port, users, questions=20)
+        assert not server.sessions
+        return result
+
+    print(f"{'users':>8} {'requests':>10} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for users in (100, 1000):
+        result = asyncio.run(run(users))
+        print(
+            f"{users:>8} {result['requests']:>10} {result['rps']:>10.0f}"
+            f" {result['p50_ms']:>10.2f} {result['p99_ms']:>10.2f}"
+        )
+
+
+def bench_scheduler(tmpdir):
+    print("-- scheduler: spaced repetition over 100k cards")
+    import random
+
+    questions = synthetic_questions(100_000, Question)
+    path = os.path.join(tmpdir, "review.log")
+    store = ReviewStore(path)
+    start = time.perf_counter()
+    scheduler = Scheduler(store, questions)
+    print(f"build queue:     {time.perf_counter() - start:.3f} s")
+
+    # Study in batches of 50 a minute apart until nothing is due
+    rng = random.Random(0)
+    now = time.time()
+    start = time.perf_counter()
+    reviews = 0
+    while True:
+        due = scheduler.take_due(50, now)
+        if not due:
+            break
+        for q in due:
+            scheduler.review(q, rng.choice((1, 3, 4, 5)), now)
+            reviews += 1
+        now += 60
+    elapsed = time.perf_counter() - start
+    print(f"{reviews} reviews:  {elapsed:.3f} s, {elapsed / reviews * 1e6:.1f} us each")
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        for q in scheduler.take_due(1, now + 30 * DAY):
+            scheduler.review(q, 4, now + 30 * DAY)
+    per_pick = (time.perf_counter() - start) / 1000
+    print(f"pick + review:   {per_pick * 1e6:.1f} us with all cards queued")
+
+    store.close()
+    start = time.perf_counter()
+    reloaded = ReviewStore(path)
+    print(
+        f"reload log:      {time.perf_counter() - start:.3f} s,"
+        f" {os.path.getsize(path) / 1024:.0f} KB for {len(reloaded.cards)} cards"
+    )
+    assert {k: c.due for k, c in reloaded.cards.items()} == {
+        k: c.due for k, c in store.cards.items()
+    }
+
+
+def bench_history(tmpdir):
+    print("-- history: 1M logged attempts")
+    import random
+
+    rng = random.Random(0)
+    sheets = [f"Sheet{s}" for s in range(10)]
+    ids = [i.to_bytes(8, "big") for i in range(5000)]
+    log = AttemptLog(os.path.join(tmpdir, "attempts.sqlite3"))
+
+    attempts = 1_000_000
+    start = time.perf_counter()
+    for _ in range(attempts):
+        log.record(
+            rng.choice(ids),
+            rng.choice(sheets),
+            rng.randrange(4),
+            rng.random() < 0.7,
+            rng.random() * 20,
+        )
+    queued = time.perf_counter() - start
+    log.flush()
+    written = time.perf_counter() - start
+    print(f"record():  {queued / attempts * 1e6:.2f} us per call, caller's thread")
+    print(f"written:   {written:.2f} s total, {attempts / written:.0f} attempts/s")
+
+    start = time.perf_counter()
+    for sheet in sheets:
+        weakest = log.weakest(sheet, limit=20, min_attempts=5)
+    elapsed = (time.perf_counter() - start) / len(sheets)
+    print(f"weakest(): {elapsed * 1000:.2f} ms per sheet")
+    assert len(weakest) == 20
+    log.close()
+
+
+def scan_search(sheets, query):
+    """Folds every question per query; the baseline SearchIndex replaces."""
+    terms = [tokenize(term) for term in query.split()]
+    words = [w for ws in terms for w in ws]
+    results = []
+    for sheet, questions in sheets.items():
+        for q in questions:
+            text = tokenize(" ".join([q.question, *map(str, q.choices)]))
+            if all(
+                any(t == w or (i == len(words) - 1 and t.startswith(w)) for t in text)
+                for i, w in enumerate(words)
+            ):
+                results.append((sheet, q))
+    return results
+
+
+def bench_search(tmpdir):
+    print("-- search: 100k questions in 10 sheets")
+    sheets = {}
+    for s in range(10):
+        sheets[f"Sheet{s}"] = [
+            Question(f"Bài {s}. {q.question}", q.choices, q.correct_answers)
+            for q in synthetic_questions(10000, Question)
+        ]
+
+    index = SearchIndex()
+    start = time.perf_counter()
+    for sheet, questions in sheets.items():
+        index.add(questions, "bank.xlsx", sheet)
+    print(f"build:  {time.perf_counter() - start:.2f} s for {len(index)} questions")
+
+    print(f"{'query':>24} {'hits':>6} {'index ms':>9} {'scan ms':>9}")
+    for query in ("dung", "nhận định", "phuong an 1 cua cau 42", "tat ca cac dap"):
+        hits = index.search(query)
+        expected = scan_search(sheets, query)
+        assert {q.id for _, q in hits} == {q.id for _, q in expected}, query
+        indexed = timed(index.search, query)
+        scanned = timed(scan_search, sheets, query, repeat=1)
+        print(
+            f"{query:>24} {len(hits):>6} {indexed * 1000:>9.2f}"
+            f" {scanned * 1000:>9.0f}"
+        )
+    assert fold("Đáp Án") == "dap an"
+
+
+def bench_library(tmpdir):
+    print(f"-- library: 500 banks in 25 folders on {os.cpu_count()} CPUs")
+    root = os.path.join(tmpdir, "library")
+    template = os.path.join(tmpdir, "library.xlsx")
+    make_workbook(template, 3, 50)
+    paths = []
+    for i in range(500):
+        folder = os.path.join(root, f"Môn {i % 25}")
+        os.makedirs(folder, exist_ok=True)
+        paths.append(os.path.join(folder, f"bank{i}.xlsx"))
+        shutil.copy(template, paths[-1])
+    manifest = os.path.join(tmpdir, "library.pickle")
+
+    def scan(label, workers=None):
+        start = time.perf_counter()
+        library = Library(root, manifest)
+        counts = library.scan(workers)
+        elapsed = time.perf_counter() - start
+        print(f"{label:>22} {elapsed:>8.2f} s  {counts}")
+        return library
+
+    full = scan("first scan")
+    assert len(full.catalogue()) == 500 * 3
+    scan("unchanged")
+    for path in paths[:50]:
+        os.utime(path)
+    scan("50 touched, same hash")
+    for path in paths[:5]:
+        make_workbook(path, 2, 50)
+    library = scan("5 edited")
+    assert len(library.catalogue()) == 500 * 3 - 5
+    os.remove(manifest)
+    scan("no manifest, 1 worker", workers=1)
+
+
+def bench_bankfile(tmpdir):
+    print("-- bankfile: exported bank opened through mmap vs. cached pickle")
+
+    def sheets(count, per_sheet=50000):
+        # Generators, so that writing a 1M-question bank stays small here
+        return {
+            f"Sheet{s}": (
+                Question(f"Bài {s}. {q.question}", q.choices, q.correct_answers)
+                for q in synthetic_questions(min(per_sheet, count), Question)
+            )
+            for s in range(max(1, count // per_sheet))
+        }
+
+    small = {sheet: list(questions) for sheet, questions in sheets(100000).items()}
+    path = os.path.join(tmpdir, "small.qbank")
+    write_bank(path, small)
+    bank = MappedBank(path)
+    for sheet, questions in small.items():
+        mapped = bank[sheet]
+        assert mapped[:] == questions
+        assert [q.id for q in mapped[::997]] == [q.id for q in questions[::997]]
+    bank.close()
+    cache = QuestionCache(os.path.join(tmpdir, "bankfile-cache"))
+    cache.put("small", list(small), small)
+    del small
+
+    start = time.perf_counter()
+    path = os.path.join(tmpdir, "large.qbank")
+    write_bank(path, sheets(1000000))
+    elapsed = time.perf_counter() - start
+    print(f"export 1M questions: {elapsed:.1f} s, {os.path.getsize(path) / 1e6:.0f} MB")
+
+    read = (
+        "import random, time\n"
+        "start = time.perf_counter()\n"
+        "{open}\n"
+        "opened = time.perf_counter() - start\n"
+        "sheets = list(bank)\n"
+        "for _ in range(1000):\n"
+        "    questions = bank[random.choice(sheets)]\n"
+        "    questions[random.randrange(len(questions))]\n"
+        "rss = dict(l.split()[:2] for l in open('/proc/self/status') if 'Rss' in l)\n"
+        "print(opened * 1000, rss['RssAnon:'], rss['RssFile:'])\n"
+    )
+    modes = {
+        "pickle 100k": read.format(
+            open="import bank_cache\n"
+            f"cache = bank_cache.QuestionCache({cache.directory!r})\n"
+            "bank = cache.get('small')[1]"
+        ),
+        "mmap 100k": read.format(
+            open="import bank_file\n"
+            f"bank = bank_file.MappedBank({os.path.join(tmpdir, 'small.qbank')!r})"
+        ),
+        "mmap 1M": read.format(
+            open=f"import bank_file\nbank = bank_file.MappedBank({path!r})"
+        ),
+    }
+    # Mapped pages count as file RSS: clean page cache shared by every process
+    print("open, then 1000 random questions:")
+    print(f"{'mode':>12} {'open ms':>10} {'anon MB':>10} {'file MB':>10}")
+    for mode, code in modes.items():
+        out = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        opened, anon, file = map(float, out.stdout.split())
+        print(f"{mode:>12} {opened:>10.2f} {anon / 1024:>10.1f} {file / 1024:>10.1f}")
+
+
+BENCHMARKS = {
+    "load": bench_load,
+    "lazy": bench_lazy,
+    "cache": bench_cache,
+    "fill": bench_fill,
+    "memory": bench_memory,
+    "parallel": bench_parallel,
+    "render": bench_render,
+    "records": bench_records,
+    "docx": bench_docx,
+    "styles": bench_styles,
+    "pdf": bench_pdf,
+    "answers": bench_answers,
+    "session": bench_session,
+    "server": bench_server,
+    "scheduler": bench_scheduler,
+    "history": bench_history,
+    "dedup": bench_dedup,
+    "search": bench_search,
+    "library": bench_library,
+    "bankfile": bench_bankfile,
+    "sampling": bench_sampling,
+    "mix": bench_mix,
+    "prefetch": bench_prefetch,
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name in names:
+            BENCHMARKS[name](tmpdir)
@@ -0,0 +1,87 @@
+import threading
+
+
+class QuestionIndex:
+    """
+    Global index of questions by content id, across sheets and files.
+
+    add() swaps every question already in the index for the copy it holds,
+    so a question repeated in many sheets or banks is kept in memory once.
+    A copy whose correct answers differ from the indexed one is a conflict:
+    it is counted and kept as its own object, since the two disagree.
+    Loader threads may add sheets at the same time; each add() runs alone.
+
+    Attributes:
+        questions (dict): id -> the first Question seen with that content.
+        duplicates (int): Questions added that were already indexed.
+        conflicts (int): Duplicates whose correct answers disagree.
+        conflicting_ids (set): Ids of the questions involved in conflicts.
+    """
+
+    def __init__(self):
+        self.questions = {}
+        self.duplicates = 0
+        self.conflicts = 0
+        self.conflicting_ids = set()
+        self._sources = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.questions)
+
+    def __contains__(self, question_id):
+        return question_id in self.questions
+
+    def get(self, question_id):
+        return self.questions.get(question_id)
+
+    def add(self, questions, source=None, sheet=None):
+        """
+        Indexes a sheet's questions and returns them with duplicates shared.
+
+        Args:
+            questions (list): The questions of one sheet.
+            source (str, optional): File the sheet comes from.
+            sheet (str, optional): Sheet name. A (source, sheet) pair that
+                was added before is not counted again.
+
+        Returns:
+            list: The questions, each replaced by the indexed copy if it has
+                the same content and answers.
+        """
+        with self._lock:
+            location = (source, sheet)
+            count = location == (None, None) or location not in self._sources
+            self._sources.add(location)
+            shared = []
+            for q in questions:
+                indexed = self.questions.get(q.id)
+                if indexed is None:
+                    self.questions[q.id] = q
+                    shared.append(q)
+                    continue
+                # Copies read back from the cache are already shared
+                agrees = indexed is q or indexed.correct_key() == q.correct_key()
+                if count:
+                    self.duplicates += 1
+                    if not agrees:
+                        self.conflicts += 1
+                        self.conflicting_ids.add(q.id)
+                shared.append(indexed if agrees else q)
+            return shared
+
+    def summary(self):
+        return (
+            f"{len(self.questions)} unique questions, {self.duplicates} duplicates,"
+            f" {self.conflicts} with conflicting answers"
+        )
+
+
+def index_sheets(all_questions, source, index=None):
+    """Passes every sheet through QuestionIndex.add, if there is an index."""
+    if index is None:
+        return all_questions
+    return {
+        sheet: index.add(questions, source, sheet)
+        for sheet, questions in all_questions.items()
+    }
@@ -0,0 +1,278 @@
+import zipfile
+
+from lxml import etree
+
+from question import Question
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+ON_VALUES = ("1", "true", "on")
+# Run children that contribute text, as in python-docx's Run.text
+TEXT_TAGS = {
+    W + "t",
+    W + "tab",
+    W + "br",
+    W + "cr",
+    W + "noBreakHyphen",
+    W + "ptab",
+}
+
+
+class _CountingReader:
+    """File wrapper that counts the bytes handed to the XML parser."""
+
+    def __init__(self, f):
+        self.f = f
+        self.count = 0
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.count += len(data)
+        return data
+
+
+def run_text(r):
+    parts = []
+    for child in r:
+        tag = child.tag
+        if tag not in TEXT_TAGS:
+            continue
+        if tag == W + "t":
+            parts.append(child.text or "")
+        elif tag == W + "br":
+            # Page and column breaks have no text equivalent
+            if child.get(W + "type", "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif tag == W + "cr":
+            parts.append("\n")
+        elif tag == W + "noBreakHyphen":
+            parts.append("-")
+        else:
+            parts.append("\t")
+    return "".join(parts)
+
+
+def rpr_bold(rPr):
+    """Bold set by a w:rPr element: True, False, or None if not set."""
+    if rPr is None:
+        return None
+    b = rPr.find(W + "b")
+    if b is None:
+        return None
+    val = b.get(W + "val")
+    return val is None or val in ON_VALUES
+
+
+def rpr_marked(rPr):
+    """
+    Highlight or shading set by a w:rPr element, which marks a correct
+    answer: True, False, or None if not set.
+    """
+    if rPr is None:
+        return None
+    if rPr.find(W + "shd") is not None:
+        return True
+    highlight = rPr.find(W + "highlight")
+    if highlight is None:
+        return None
+    return highlight.get(W + "val") != "none"
+
+
+class StyleResolver:
+    """
+    Effective bold and marked run properties from word/styles.xml.
+
+    Each style's properties are worked out once, following its basedOn chain,
+    and so is each (paragraph style, character style) pair. A run takes its
+    direct formatting first, then its character style, its paragraph style
+    and finally the document defaults; the nearest setting wins.
+    """
+
+    def __init__(self, styles=None):
+        self._styles = {}
+        self._default_style = None
+        self._defaults = (None, None)
+        self._resolved = {}
+        self._combined = {}
+        if styles is None:
+            return
+        for style in styles.iterfind(W + "style"):
+            style_id = style.get(W + "styleId")
+            self._styles[style_id] = style
+            is_default = style.get(W + "default") in ON_VALUES
+            if is_default and style.get(W + "type") == "paragraph":
+                self._default_style = style_id
+        rPr = styles.find(f"{W}docDefaults/{W}rPrDefault/{W}rPr")
+        self._defaults = (rpr_bold(rPr), rpr_marked(rPr))
+
+    @classmethod
+    def from_archive(cls, archive):
+        """Reads the styles of an open docx zip, which may have none."""
+        try:
+            with archive.open("word/styles.xml") as f:
+                return cls(etree.parse(f).getroot())
+        except KeyError:
+            return cls()
+
+    def style_props(self, style_id, seen=()):
+        """Returns (bold, marked) of a style, including the styles it is based on."""
+        if style_id in self._resolved:
+            return self._resolved[style_id]
+        style = self._styles.get(style_id)
+        if style is None or style_id in seen:
+            return None, None
+        rPr = style.find(W + "rPr")
+        bold, marked = rpr_bold(rPr), rpr_marked(rPr)
+        based_on = style.find(W + "basedOn")
+        if based_on is not None:
+            base_bold, base_marked = self.style_props(
+                based_on.get(W + "val"), seen + (style_id,)
+            )
+            bold = base_bold if bold is None else bold
+            marked = base_marked if marked is None else marked
+        self._resolved[style_id] = (bold, marked)
+        return bold, marked
+
+    def inherited(self, p_style, r_style):
+        """Returns the (bold, marked) a run gets from its styles and the defaults."""
+        key = (p_style, r_style)
+        if key not in self._combined:
+            bold = marked = None
+            for props in (
+                self.style_props(r_style),
+                self.style_props(p_style or self._default_style),
+                self._defaults,
+            ):
+                bold = props[0] if bold is None else bold
+                marked = props[1] if marked is None else marked
+            self._combined[key] = (bool(bold), bool(marked))
+        return self._combined[key]
+
+    def run_props(self, p_style, r):
+        """Returns the effective (bold, marked) of a w:r element."""
+        rPr = r.find(W + "rPr")
+        bold, marked = rpr_bold(rPr), rpr_marked(rPr)
+        if bold is None or marked is None:
+            r_style = None
+            if rPr is not None:
+                r_style_el = rPr.find(W + "rStyle")
+                if r_style_el is not None:
+                    r_style = r_style_el.get(W + "val")
+            inherited_bold, inherited_marked = self.inherited(p_style, r_style)
+            bold = inherited_bold if bold is None else bold
+            marked = inherited_marked if marked is None else marked
+        return bold, marked
+
+
+def read_paragraph(p, styles):
+    """
+    Returns (text, bold, marked) for a w:p element.
+
+    bold is True when every run is bold (and for paragraphs without runs),
+    marked when any run is highlighted or shaded, counting formatting that
+    comes from styles. Text includes hyperlinks.
+
+    Args:
+        p: The w:p element.
+        styles (StyleResolver): The document's styles.
+    """
+    p_style_el = p.find(f"{W}pPr/{W}pStyle")
+    p_style = None if p_style_el is None else p_style_el.get(W + "val")
+
+    parts = []
+    bold = True
+    marked = False
+    for child in p:
+        if child.tag == W + "r":
+            parts.append(run_text(child))
+            run_bold, run_marked = styles.run_props(p_style, child)
+            bold = bold and run_bold
+            marked = marked or run_marked
+        elif child.tag == W + "hyperlink":
+            parts.extend(run_text(r) for r in child.iterfind(W + "r"))
+    return "".join(parts), bold, marked
+
+
+def iter_paragraphs(file_path, progress=None):
+    """
+    Streams the body paragraphs of a docx file.
+
+    word/document.xml is parsed incrementally and every paragraph is dropped
+    from the tree once read, so memory use stays flat however long the
+    document is. Paragraphs inside tables, like python-docx's
+    Document.paragraphs, are skipped.
+
+    Args:
+        file_path (str): Path to the docx file.
+        progress (callable, optional): Called as progress(done, total, "KB")
+            with the amount of document XML parsed so far.
+
+    Yields:
+        tuple: (text, bold, marked) per paragraph, see read_paragraph.
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        styles = StyleResolver.from_archive(archive)
+        total = archive.getinfo("word/document.xml").file_size
+        with archive.open("word/document.xml") as f:
+            reader = _CountingReader(f)
+            done = 0
+            for _, p in etree.iterparse(reader, events=("end",), tag=W + "p"):
+                parent = p.getparent()
+                if parent is None or parent.tag != W + "body":
+                    continue  # Inside a table or text box, read with its parent
+                yield read_paragraph(p, styles)
+
+                # Free this paragraph and whatever came before it in the body
+                p.clear()
+                while p.getprevious() is not None:
+                    del parent[0]
+
+                done += 1
+                if progress is not None and done % 100 == 0:
+                    progress(reader.count // 1024, total // 1024, "KB")
+    if progress is not None:
+        progress(total // 1024, total // 1024, "KB")
+
+
+def iter_word_questions(file_path, progress=None):
+    """
+    Yields the questions of a docx file as they are read.
+
+    Bold paragraphs are the question (several in a row are joined with a
+    newline), the paragraphs after it are the choices, and highlighted or
+    shaded choices are the correct answers.
+
+    Args:
+        file_path (str): Path to the docx file.
+        progress (callable, optional): Passed on to iter_paragraphs.
+    """
+    current_question = None
+    choices = []
+    correct_answers = []
+
+    bool_ques = False
+    for text, bold, marked in iter_paragraphs(file_path, progress):
+        # Check if the paragraph is part of a question (bold text)
+        if bold:
+            if bool_ques:
+                yield Question(current_question, choices, correct_answers)
+                current_question = None
+                choices = []
+                correct_answers = []
+                bool_ques = False
+            if current_question is None:
+                current_question = text.strip()
+            else:
+                current_question += "\n" + text.strip()
+        else:
+            bool_ques = True
+            if marked:
+                correct_answers.append(len(choices))
+            choices.append(text.strip())
+
+    if current_question:  # Save the last question
+        yield Question(current_question, choices, correct_answers)
+
+
+def load_word_document(file_path, progress=None):
+    """Returns the list of questions in a docx file."""
+    return list(iter_word_questions(file_path, progress))
@@ -0,0 +1,186 @@
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from scheduler import data_dir
+
+BATCH_SIZE = 512
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempts (
+    id INTEGER PRIMARY KEY,
+    question_id BLOB NOT NULL,
+    sheet TEXT NOT NULL,
+    choice INTEGER,
+    correct INTEGER NOT NULL,
+    latency REAL NOT NULL,
+    answered_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS question_stats (
+    sheet TEXT NOT NULL,
+    question_id BLOB NOT NULL,
+    attempts INTEGER NOT NULL,
+    wrong INTEGER NOT NULL,
+    last_at REAL NOT NULL,
+    PRIMARY KEY (sheet, question_id)
+) WITHOUT ROWID;
+"""
+
+INSERT_ATTEMPT = """
+INSERT INTO attempts (question_id, sheet, choice, correct, latency, answered_at)
+VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+UPDATE_STATS = """
+INSERT INTO question_stats (sheet, question_id, attempts, wrong, last_at)
+VALUES (?, ?, 1, ?, ?)
+ON CONFLICT (sheet, question_id) DO UPDATE SET
+    attempts = attempts + 1,
+    wrong = wrong + excluded.wrong,
+    last_at = excluded.last_at
+"""
+
+WEAKEST = """
+SELECT question_id, attempts, wrong
+FROM question_stats
+WHERE sheet = ? AND attempts >= ? AND wrong > 0
+ORDER BY CAST(wrong AS REAL) / attempts DESC, wrong DESC, last_at DESC
+LIMIT ?
+"""
+
+
+def connect(path):
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+class AttemptLog:
+    """
+    Append-only log of every answer, in SQLite.
+
+    record() only queues the attempt; a writer thread inserts queued
+    attempts in batches of up to BATCH_SIZE per transaction, so the UI never
+    waits on the disk. Alongside the raw attempts it keeps per (sheet,
+    question) totals, which make weakest() a lookup over one sheet's
+    questions however many attempts there are. Pending attempts are written
+    out by close(), which also runs at interpreter exit.
+
+    Args:
+        path (str, optional): Database file. Defaults to attempts.sqlite3 in
+            the data directory, PLNN_DATA_DIR or ~/.local/share/plnnstudy.
+
+    Attributes:
+        error (Exception): Why the writer thread stopped, if it failed;
+            attempts recorded after that are not written.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(data_dir(), "attempts.sqlite3")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with connect(self.path) as connection:
+            connection.executescript(SCHEMA)
+        connection.close()
+        self._pending = queue.Queue()
+        self._reader = None
+        self.error = None
+        self._writer = threading.Thread(target=self._write_batches, daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def record(self, question_id, sheet, choice, correct, latency):
+        """Queues one attempt; choice is the original choice index or None."""
+        self._pending.put(
+            (question_id, sheet, choice, int(correct), latency, time.time())
+        )
+
+    def for_sheet(self, sheet):
+        """
+        Returns a QuizSession listener that records answers under sheet, or
+        under sheet[question.id] when sheet is a dict.
+        """
+        return SheetRecorder(self, sheet)
+
+    def _write_batches(self):
+        try:
+            connection = connect(self.path)
+        except sqlite3.Error as e:
+            self.error = e
+            return
+        try:
+            while True:
+                batch = [self._pending.get()]
+                while len(batch) < BATCH_SIZE:
+                    try:
+                        batch.append(self._pending.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = None in batch
+                attempts = [attempt for attempt in batch if attempt is not None]
+                try:
+                    with connection:
+                        connection.executemany(INSERT_ATTEMPT, attempts)
+                        connection.executemany(
+                            UPDATE_STATS,
+                            [(a[1], a[0], 1 - a[3], a[5]) for a in attempts],
+                        )
+                except sqlite3.Error:
+                    pass  # History is best effort, answering must go on
+                finally:
+                    for _ in batch:
+                        self._pending.task_done()
+                if stop:
+                    return
+        except Exception as e:
+            self.error = e
+        finally:
+            connection.close()
+
+    def flush(self):
+        """
+        Waits until every recorded attempt is in the database.
+
+        Returns straight away once the writer thread has stopped, after
+        close() or a failure, as nothing would write what is still queued.
+        """
+        pending = self._pending
+        with pending.all_tasks_done:
+            while pending.unfinished_tasks and self._writer.is_alive():
+                # Timed, in case the writer stops between the check and the wait
+                pending.all_tasks_done.wait(0.1)
+
+    def close(self):
+        if self._writer.is_alive():
+            self._pending.put(None)
+            self._writer.join()
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def weakest(self, sheet, limit=10, min_attempts=1):
+        """
+        Returns the questions of a sheet answered wrongly most often.
+
+        Returns:
+            list: (question_id, attempts, wrong) tuples, highest error rate
+                first.
+        """
+        if self._reader is None:
+            self._reader = connect(self.path)
+        return self._reader.execute(WEAKEST, (sheet, min_attempts, limit)).fetchall()
+
+
+class SheetRecorder:
+    """QuizSession listener that logs each answer to an AttemptLog."""
+
+    def __init__(self, log, sheet):
+        self.log = log
+        self.sheet = sheet
+
+    def answered(self, q, choice, correct, latency):
+        sheet = self.sheet[q.id] if isinstance(self.sheet, dict) else self.sheet
+        self.log.record(q.id, sheet, choice, correct, latency)
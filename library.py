@@ -0,0 +1,263 @@
+"""
+Batch import of every question bank under a directory tree.
+
+Usage:
+    python library.py DIRECTORY [--workers N]
+"""
+
+import argparse
+import hashlib
+import os
+import time
+from concurrent.futures import as_completed
+
+from bank_cache import DEFAULT_CACHE_DIR, FORMAT_VERSION, read_entry, write_entry
+from dedup import index_sheets
+from util import pool_size, process_pool
+
+BANK_EXTENSIONS = (".xlsx", ".docx", ".pdf")
+PARALLEL_MIN_FILES = 4
+
+
+def find_banks(root):
+    """
+    Yields the path of every xlsx, docx and PDF file under root, relative to
+    root and in a stable order. Hidden files and Office lock files (~$...)
+    are skipped.
+    """
+    for directory, subdirs, files in os.walk(root):
+        subdirs[:] = sorted(d for d in subdirs if not d.startswith("."))
+        for name in sorted(files):
+            if name.startswith((".", "~$")):
+                continue
+            if os.path.splitext(name)[1].lower() in BANK_EXTENSIONS:
+                yield os.path.relpath(os.path.join(directory, name), root)
+
+
+def file_digest(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def parse_bank(path):
+    """Returns {sheet: questions} for one xlsx, docx or PDF file."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".xlsx":
+        from xlsx_loader import load_workbook_questions
+
+        return load_workbook_questions(path, workers=1)
+    if extension == ".docx":
+        from docx_loader import load_word_document
+
+        return {"Word Document": load_word_document(path)}
+    if extension == ".pdf":
+        from pdf_loader import load_pdf_questions
+
+        return {"PDF": load_pdf_questions(path, workers=1)}
+    raise ValueError(f"Unsupported file type: {path}")
+
+
+def _parse_worker(path):
+    """Returns (digest, all_questions, error) so one bad file fails alone."""
+    try:
+        digest = file_digest(path)
+        return digest, parse_bank(path), None
+    except Exception as e:
+        return None, None, f"{type(e).__name__}: {e}"
+
+
+class Library:
+    """
+    Merged catalogue of the question banks under a directory tree.
+
+    What each file parsed to is kept in a manifest next to the question
+    cache, along with the file's size, mtime and content hash. scan() only
+    re-parses files whose size or content changed: a file with the same
+    size and mtime is trusted as is, and one whose mtime alone changed is
+    hashed and kept if the hash still matches. Changed files are parsed
+    across a process pool, one file per task.
+
+    Args:
+        root (str): Directory to import.
+        manifest_path (str, optional): Where to keep the manifest. Defaults
+            to a file named after root in PLNN_CACHE_DIR or
+            ~/.cache/plnnstudy.
+
+    Attributes:
+        files (dict): Relative path -> (size, mtime_ns, digest,
+            all_questions) for every file found; digest and all_questions
+            are None for files that could not be parsed.
+        errors (dict): Relative path -> why the file could not be parsed.
+            Such files are retried once they change.
+    """
+
+    def __init__(self, root, manifest_path=None):
+        self.root = os.path.abspath(root)
+        if manifest_path is None:
+            name = hashlib.blake2b(self.root.encode(), digest_size=8).hexdigest()
+            directory = os.environ.get("PLNN_CACHE_DIR", DEFAULT_CACHE_DIR)
+            manifest_path = os.path.join(directory, f"library-{name}.pickle")
+        self.manifest_path = manifest_path
+        self.files = {}
+        self.errors = {}
+        self._refreshed = False  # Entries changed since the manifest was saved
+        self.load()
+
+    def load(self):
+        # Without a readable manifest of this version, everything is parsed
+        entry = read_entry(self.manifest_path)
+        if entry is not None and entry[0] == FORMAT_VERSION:
+            _, self.files, self.errors = entry
+
+    def save(self):
+        if write_entry(self.manifest_path, (FORMAT_VERSION, self.files, self.errors)):
+            self._refreshed = False
+
+    def _unchanged(self, rel, stat):
+        """Tells whether the manifest entry of rel still matches the file."""
+        entry = self.files.get(rel)
+        if entry is None or entry[0] != stat.st_size:
+            return False
+        if entry[1] == stat.st_mtime_ns:
+            return True
+        try:
+            digest = file_digest(os.path.join(self.root, rel))
+        except OSError:
+            return False
+        if digest != entry[2]:
+            return False
+        # Store the new mtime, so the file is not hashed again next scan
+        self.files[rel] = (stat.st_size, stat.st_mtime_ns) + entry[2:]
+        self._refreshed = True
+        return True
+
+    def scan(self, workers=None, progress=None):
+        """
+        Brings the catalogue up to date with the directory tree.
+
+        Args:
+            workers (int, optional): Number of processes to parse changed
+                files with. Defaults to the number of CPUs; 1 parses in this
+                process.
+            progress (callable, optional): Called as progress(done, total,
+                "files") after each changed file is parsed. An exception it
+                raises stops the scan, keeping the files parsed so far.
+
+        Returns:
+            dict: How many files were kept, parsed, removed and failed.
+        """
+        stats = {}
+        changed = []
+        found = set()
+        for rel in find_banks(self.root):
+            try:
+                stats[rel] = os.stat(os.path.join(self.root, rel))
+            except OSError:
+                continue  # Removed while walking
+            found.add(rel)
+            if not self._unchanged(rel, stats[rel]):
+                changed.append(rel)
+        removed = [rel for rel in self.files if rel not in found]
+        for rel in removed:
+            del self.files[rel]
+            self.errors.pop(rel, None)
+
+        done = 0
+        if progress is not None:
+            progress(done, len(changed), "files")
+        failed = 0
+        try:
+            for rel, result in self._parse(changed, workers):
+                digest, all_questions, error = result
+                stat = stats[rel]
+                self.files[rel] = (
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                    digest,
+                    all_questions,
+                )
+                if error is None:
+                    self.errors.pop(rel, None)
+                else:
+                    self.errors[rel] = error
+                    failed += 1
+                done += 1
+                if progress is not None:
+                    progress(done, len(changed), "files")
+        finally:
+            # Files parsed before a cancelled scan are kept for the next one
+            if done or removed or self._refreshed:
+                self.save()
+        return {
+            "kept": len(found) - len(changed),
+            "parsed": len(changed) - failed,
+            "removed": len(removed),
+            "failed": failed,
+        }
+
+    def _parse(self, changed, workers=None):
+        """Yields (rel, (digest, all_questions, error)) as files finish."""
+        workers = pool_size(len(changed), workers)
+        if workers == 1 or len(changed) < PARALLEL_MIN_FILES:
+            for rel in changed:
+                yield rel, _parse_worker(os.path.join(self.root, rel))
+            return
+
+        executor = process_pool(workers)
+        try:
+            futures = {
+                executor.submit(_parse_worker, os.path.join(self.root, rel)): rel
+                for rel in changed
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    def catalogue(self, index=None):
+        """
+        Returns every sheet of every file as one {name: questions} dict.
+
+        Names are "<relative path> / <sheet>", sorted by path. With an
+        index, every sheet goes through QuestionIndex.add, so a question
+        repeated across files is shared and conflicting answers are counted.
+        """
+        catalogue = {}
+        for rel in sorted(self.files):
+            if self.files[rel][3] is None:
+                continue
+            path = os.path.join(self.root, rel)
+            all_questions = index_sheets(self.files[rel][3], path, index)
+            for sheet, questions in all_questions.items():
+                catalogue[f"{rel} / {sheet}"] = questions
+        return catalogue
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("directory")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    from dedup import QuestionIndex
+
+    start = time.perf_counter()
+    library = Library(args.directory)
+    counts = library.scan(args.workers)
+    index = QuestionIndex()
+    catalogue = library.catalogue(index)
+    print(
+        f"Scanned {args.directory} in {time.perf_counter() - start:.2f}s:"
+        f" {counts['kept']} unchanged, {counts['parsed']} parsed,"
+        f" {counts['removed']} removed, {counts['failed']} failed"
+    )
+    print(f"{len(catalogue)} sheets, {index.summary()}")
+    for rel, error in library.errors.items():
+        print(f"  {rel}: {error}")
+
+
+if __name__ == "__main__":
+    main()
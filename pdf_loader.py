@@ -0,0 +1,229 @@
+import re
+import unicodedata
+
+import pymupdf
+
+from question import Question
+from util import pool_size, process_pool
+
+PARALLEL_MIN_PAGES = 64
+PAGES_PER_TASK = 32
+
+QUESTION_PREFIX = "Câu Hỏi"
+ANSWER_PREFIXES = (
+    "Câu trả lời đúng là:",
+    "Đáp án chính xác là",
+    "The correct answers are",
+)
+ANSWER_RE = re.compile(
+    "(?:" + "|".join(map(re.escape, ANSWER_PREFIXES)) + r")\s*:?"
+)
+SKIP_PREFIX = "Chọn câu:"
+CHOICE_RE = re.compile(r"[a-hA-H]\.")
+CHOICE_LETTERS = "abcdefgh"
+
+
+_worker_doc = None
+
+
+def _init_worker(file_path):
+    global _worker_doc
+    _worker_doc = pymupdf.open(file_path)
+
+
+def _extract_worker_pages(start, stop):
+    return [_worker_doc.load_page(i).get_text("text") for i in range(start, stop)]
+
+
+def iter_page_texts(file_path, workers=None):
+    """
+    Yields the text of every page of a PDF, in page order.
+
+    Long documents are split into runs of PAGES_PER_TASK pages that worker
+    processes extract in parallel, each opening the document once; the runs
+    are still handed out in order. Short documents and workers=1 are read in
+    this process.
+
+    Args:
+        file_path (str): Path to the PDF file.
+        workers (int, optional): Number of worker processes. Defaults to the
+            number of CPUs.
+    """
+    with pymupdf.open(file_path) as doc:
+        page_count = doc.page_count
+        if page_count >= PARALLEL_MIN_PAGES:
+            workers = pool_size(-(-page_count // PAGES_PER_TASK), workers)
+        if page_count < PARALLEL_MIN_PAGES or workers == 1:
+            for page in doc:
+                yield page.get_text("text")
+            return
+
+    executor = process_pool(workers, _init_worker, (file_path,))
+    try:
+        futures = [
+            executor.submit(
+                _extract_worker_pages, start, min(start + PAGES_PER_TASK, page_count)
+            )
+            for start in range(0, page_count, PAGES_PER_TASK)
+        ]
+        for future in futures:
+            yield from future.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def iter_pdf_lines(file_path, workers=None):
+    """
+    Yields the lines of a PDF as one stream, page after page.
+
+    Each page is split on its own, so the last line of a page is never glued
+    to the first line of the next one.
+    """
+    for text in iter_page_texts(file_path, workers):
+        yield from text.splitlines()
+
+
+def normalize_answer(text):
+    """Folds choice and answer text to a comparable key."""
+    text = unicodedata.normalize("NFC", text)
+    return " ".join(text.split()).casefold().rstrip(" .;")
+
+
+def answer_index(choices):
+    """
+    Maps normalised choice text, and the letters a to h, to choice positions.
+
+    Text takes precedence over letters, and the first of several equal
+    choices wins.
+
+    Returns:
+        tuple: (index, span) where span is the most comma separated parts
+            any choice has.
+    """
+    index = {}
+    span = 1
+    for i, choice in enumerate(choices):
+        index.setdefault(normalize_answer(choice), i)
+        span = max(span, choice.count(",") + 1)
+    for i, letter in enumerate(CHOICE_LETTERS[: len(choices)]):
+        index.setdefault(letter, i)
+    return index, span
+
+
+def resolve_answers(answers_text, index, span=1):
+    """
+    Resolves the text after an answer prefix to choice positions.
+
+    The whole text is tried first, then comma separated parts, joining
+    neighbouring parts back together for choices that contain commas, and
+    finally whitespace separated letters such as "a c". Each answer is
+    looked up in index, so the work grows with the length of the line only.
+
+    Args:
+        answers_text (str): The text after the answer prefix.
+        index (dict): Normalised choice text and letters to positions.
+        span (int, optional): The most comma separated parts to join.
+
+    Returns:
+        tuple: (positions, unresolved) where unresolved lists the parts that
+            match no choice.
+    """
+    positions = []
+    unresolved = []
+    key = normalize_answer(answers_text)
+    if not key:
+        return positions, unresolved
+    if key in index:
+        return [index[key]], unresolved
+
+    parts = [part for part in answers_text.split(",") if part.strip()]
+    start = 0
+    while start < len(parts):
+        for stop in range(min(len(parts), start + span), start, -1):
+            key = normalize_answer(",".join(parts[start:stop]))
+            if key in index:
+                positions.append(index[key])
+                start = stop
+                break
+        else:
+            part = parts[start]
+            words = [normalize_answer(word) for word in part.split()]
+            if words and all(word in index for word in words):
+                positions.extend(index[word] for word in words)
+            else:
+                unresolved.append(part.strip())
+            start += 1
+    return positions, unresolved
+
+
+def iter_questions(lines, diagnostics=None):
+    """
+    Yields questions from the lines of a quiz review PDF.
+
+    A "Câu Hỏi" line starts a question, "a." to "h." lines are its choices
+    and an answer line names the correct choices, by text or letter. The
+    parser keeps its state from one line to the next, so a question or
+    choice that runs over a page break comes out whole. Questions without
+    choices or without a resolved correct answer are left out.
+
+    Args:
+        lines (iterable): Lines of text, e.g. from iter_pdf_lines.
+        diagnostics (list, optional): Gets a (question, answer) tuple for
+            every answer that matches none of the question's choices.
+    """
+    question = None
+    choices = []
+    correct_answers = []
+    # Whether the previous line was a lettered choice that later lines extend
+    in_choice = False
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith(QUESTION_PREFIX):
+            if question and choices and correct_answers:
+                yield Question(question, choices, correct_answers)
+            question = line
+            choices = []
+            correct_answers = []
+            in_choice = False
+        elif CHOICE_RE.match(line):
+            choices.append(line[2:].strip())
+            in_choice = True
+        elif line.startswith(ANSWER_PREFIXES):
+            answers_text = ANSWER_RE.sub("", line, count=1)
+            positions, unresolved = resolve_answers(
+                answers_text, *answer_index(choices)
+            )
+            correct_answers = sorted(set(positions))
+            if diagnostics is not None:
+                diagnostics.extend((question, answer) for answer in unresolved)
+            in_choice = False
+        elif line.startswith(SKIP_PREFIX):
+            continue
+        elif in_choice:
+            # Wrapped choice text, possibly continued on the next page
+            choices[-1] = f"{choices[-1]} {line}".strip()
+        else:
+            choices.append(line)
+
+    if question and choices and correct_answers:  # Save the last question
+        yield Question(question, choices, correct_answers)
+
+
+def extract_questions(lines, diagnostics=None):
+    """Returns the list of questions in an iterable of lines."""
+    return list(iter_questions(lines, diagnostics))
+
+
+def load_pdf_questions(file_path, workers=None, diagnostics=None):
+    """
+    Returns the list of questions in a quiz review PDF.
+
+    Args:
+        file_path (str): Path to the PDF file.
+        workers (int, optional): Passed on to iter_page_texts.
+        diagnostics (list, optional): Passed on to iter_questions.
+    """
+    return extract_questions(iter_pdf_lines(file_path, workers), diagnostics)
@@ -0,0 +1,91 @@
+import hashlib
+import sys
+import unicodedata
+
+
+def intern_text(value):
+    """Interns strings so that repeated choices share one object."""
+    return sys.intern(value) if type(value) is str else value
+
+
+def normalize_text(text):
+    """Folds text for comparison: NFC, single spaces, no case."""
+    return " ".join(unicodedata.normalize("NFC", str(text)).split()).casefold()
+
+
+def content_id(question, choices):
+    """
+    Returns a stable 8-byte hash of a question's normalised content.
+
+    The choices are sorted first, so the same question with its choices in
+    another order gets the same id.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(normalize_text(question).encode())
+    for choice in sorted(normalize_text(choice) for choice in choices):
+        digest.update(b"\0" + choice.encode())
+    return digest.digest()
+
+
+class Question:
+    """
+    One multiple-choice question, as produced by every loader.
+
+    Attributes:
+        question: The question text, shared like the choices.
+        choices (tuple): The choices, in file order; equal strings are shared
+            between questions.
+        correct_answers (tuple): Indices into choices of the correct answers,
+            empty when the file marks none.
+        id (bytes): content_id of the question, the same for copies of it in
+            other sheets and files.
+    """
+
+    __slots__ = ("question", "choices", "correct_answers", "_id")
+
+    def __init__(self, question, choices, correct_answers=()):
+        self.question = intern_text(question)
+        self.choices = tuple(map(intern_text, choices))
+        self.correct_answers = tuple(correct_answers)
+        self._id = None
+
+    @property
+    def id(self):
+        if self._id is None:
+            self._id = content_id(self.question, self.choices)
+        return self._id
+
+    def correct_key(self):
+        """The normalised texts of the correct answers, whatever their order."""
+        return frozenset(normalize_text(self.choices[i]) for i in self.correct_answers)
+
+    def is_correct(self, choice_index):
+        return choice_index in self.correct_answers
+
+    def answer_letters(self, order=None):
+        """
+        Returns the letters of the correct answers, e.g. "A" or "A, C".
+
+        Args:
+            order (list, optional): Original choice index shown at each
+                position, when the choices were shuffled for display.
+        """
+        if order is None:
+            positions = self.correct_answers
+        else:
+            positions = [i for i, original in enumerate(order) if self.is_correct(original)]
+        return ", ".join(chr(65 + i) for i in sorted(positions))
+
+    def __eq__(self, other):
+        if not isinstance(other, Question):
+            return NotImplemented
+        return (
+            self.question == other.question
+            and self.choices == other.choices
+            and self.correct_answers == other.correct_answers
+        )
+
+    def __repr__(self):
+        return (
+            f"Question({self.question!r}, {self.choices!r}, {self.correct_answers!r})"
+        )
@@ -1,7 +1,12 @@
-import pandas as pd
-import random
 import os
-from openpyxl import load_workbook
+import sys
+from bank_cache import QuestionCache
+from bank_file import SUFFIX, MappedBank
+from dedup import QuestionIndex
+from history import AttemptLog
+from library import Library
+from quiz_engine import QuizSession, weighted_sample
+from xlsx_loader import load_workbook_questions
 
 
 class color:
@@ -33,7 +38,7 @@ def choose_file(directory="."):
     """
 
     # Get all files with supported extensions
-    supported_extensions = ".xlsx"
+    supported_extensions = (".xlsx", SUFFIX)
     supported_files = [
         f
         for f in glob(os.path.join(directory, "*"))
@@ -73,87 +78,30 @@ def choose_file(directory="."):
             print("Invalid input. Please enter a number or 'q'.")
 
 
-def process_sheet(sheet, file_path):
-    df = pd.read_excel(file_path, sheet)
-    wb = load_workbook(file_path, data_only=True)
-    ws = wb[sheet]
-
-    questions = []
-    current_question = None
-    choices = []
-    correct_answer = None
-
-    for index, row in df.iterrows():
-        cell_index = index + 2  # Adjust for zero-based index and header row
-        if not pd.isnull(row.iloc[0]):  # New question
-            if current_question:  # Save the previous question
-                questions.append(
-                    {
-                        "question": current_question,
-                        "choices": choices,
-                        "correct_answer": correct_answer,
-                    }
-                )
-                current_question = None
-                choices = []
-                correct_answer = None
-
-            current_question = row.iloc[1]
-        choices.append(row.iloc[2])
-        if get_correct_answer(ws, cell_index, 3):  # Check the color of the answer cell
-            correct_answer = len(choices) - 1  # Update the correct answer index
-
-    if current_question:  # Save the last question
-        questions.append(
-            {
-                "question": current_question,
-                "choices": choices,
-                "correct_answer": correct_answer,
-            }
-        )
-
-    return questions
-
-
-def get_correct_answer(ws, row, col):
-    cell = ws.cell(row=row, column=col)
-    return (
-        cell.fill.bgColor.index != "00000000" or cell.fill.fgColor.index != "00000000"
+def ask_questions(questions, listeners=()):
+    session = QuizSession(
+        questions, shuffle_questions=True, shuffle_choices=True, listeners=listeners
     )
 
-
-def ask_questions(questions):
-    incorrect_count = 0
-    random.shuffle(questions)  # Shuffle the order of questions
-
-    for i, q in enumerate(questions):
+    while not session.finished():
+        q = session.current()
         print(
             color.BOLD
             + color.UNDERLINE
-            + f"\nQ{i+1}:"
+            + f"\nQ{session.index + 1}:"
             + color.END
-            + f" {q['question']}"
+            + f" {q.question}"
         )
 
-        choices = q["choices"]
-        correct_answer_index = q["correct_answer"]
-
-        # Shuffle choices and track the index of the correct answer
-        indexed_choices = list(enumerate(choices))
-        random.shuffle(indexed_choices)
-
-        new_correct_answer_index = None
-        for idx, (original_idx, choice) in enumerate(indexed_choices):
+        for idx, choice in enumerate(session.shown_choices()):
             print(color.BOLD + f"   {chr(65+idx)}." + color.END + f" {choice}")
-            if original_idx == correct_answer_index:
-                new_correct_answer_index = idx
 
         answer = (
             input(color.BOLD + color.UNDERLINE + "Your answer:" + color.END + " ")
             .strip()
             .upper()
         )
-        valid_choices = [chr(65 + k) for k in range(len(choices))]
+        valid_choices = [chr(65 + k) for k in range(len(q.choices))]
 
         while answer not in valid_choices:
             answer = (
@@ -169,66 +117,132 @@ def ask_questions(questions):
                 .upper()
             )
 
-        if ord(answer) - 65 == new_correct_answer_index:
+        if session.submit(ord(answer) - 65):
             print(color.BOLD + color.GREEN + "CORRECT!" + color.END)
-        elif new_correct_answer_index == None:
+        elif not q.correct_answers:
             print(
                 color.BOLD
                 + color.RED
                 + "No answer in file."
                 + color.END
             )
-            incorrect_count += 1
         else:
             print(
                 color.BOLD
                 + color.RED
-                + f"INCORRECT! The correct answer is {chr(65 + new_correct_answer_index)}"
+                + f"INCORRECT! The correct answer is {session.answer_letters()}"
                 + color.END
             )
-            incorrect_count += 1
 
         input(color.YELLOW + "Press any key to continue..." + color.END)
+        session.next()
 
     print(
         color.BOLD
         + color.BLUE
-        + f"\nYou got {incorrect_count} out of {len(questions)} questions incorrect.\n\n"
+        + f"\nYou got {session.incorrect_count} out of {session.total()} questions incorrect.\n\n"
         + color.END
     )
 
 
-def main():
-    file_path = choose_file()
+def parse_selection(text, sheets):
+    """
+    Parses a quiz selection such as "2" or a mix such as "1, 3*2, 4".
+
+    Returns:
+        dict: Sheet -> weight, 1 unless given after "*", or None if the text
+            is not a valid selection.
+    """
+    weights = {}
+    for part in text.split(","):
+        number, _, weight = part.partition("*")
+        number, weight = number.strip(), weight.strip() or "1"
+        if not number.isdigit() or int(number) not in range(1, len(sheets) + 1):
+            return None
+        try:
+            weights[sheets[int(number) - 1]] = float(weight)
+        except ValueError:
+            return None
+        if weights[sheets[int(number) - 1]] < 0:
+            return None
+    return weights
 
-    xls = pd.ExcelFile(file_path)
 
-    all_questions = {
-        sheet: process_sheet(sheet, file_path) for sheet in xls.sheet_names
-    }
+def load_library(directory, index):
+    """Imports every bank under directory, re-parsing only changed files."""
+    library = Library(directory)
+    counts = library.scan()
+    print(
+        f"{counts['kept']} files unchanged, {counts['parsed']} parsed,"
+        f" {counts['failed']} failed"
+    )
+    for rel, error in library.errors.items():
+        print(f"  {rel}: {error}")
+    return library.catalogue(index)
 
+
+def main():
+    # python quiz.py DIRECTORY quizzes over every bank in a directory tree
+    if len(sys.argv) > 1 and os.path.isdir(sys.argv[1]):
+        file_path = sys.argv[1]
+    else:
+        file_path = choose_file()
+
+    index = QuestionIndex()
+    if os.path.isdir(file_path):
+        all_questions = load_library(file_path, index)
+    elif file_path.endswith(SUFFIX):
+        all_questions = MappedBank(file_path)
+    else:
+        all_questions = load_workbook_questions(
+            file_path, lazy=True, cache=QuestionCache(), index=index
+        )
+
+    attempt_log = AttemptLog()
     sheets = list(all_questions.keys())
-    while True:
-        print("Available quizzes:")
-        for i, sheet in enumerate(sheets):
-            print(f"{i + 1}. {sheet}")
-
-        sheet_index = input(
-            "Select a quiz by entering the corresponding number: "
-        ).strip()
-        while not sheet_index.isdigit() or int(sheet_index) not in range(
-            1, len(sheets) + 1
-        ):
-            sheet_index = input(
-                f"Invalid choice. Please enter a number between 1 and {len(sheets)}: "
-            ).strip()
-
-        selected_sheet = sheets[int(sheet_index) - 1]
-        questions = all_questions[selected_sheet]
-
-        print(f"\n=== {selected_sheet} ===")
-
-        ask_questions(questions)
+    try:
+        while True:
+            print("Available quizzes:")
+            for i, sheet in enumerate(sheets):
+                print(f"{i + 1}. {sheet}")
+
+            # Several numbers mix sheets, e.g. "1, 3*2" asks sheet 3 twice as often
+            weights = parse_selection(
+                input(
+                    "Select a quiz by entering the corresponding number"
+                    " (or several, e.g. 1, 3*2): "
+                ),
+                sheets,
+            )
+            while not weights or not any(weights.values()):
+                weights = parse_selection(
+                    input(f"Invalid choice. Enter numbers from 1 to {len(sheets)}: "),
+                    sheets,
+                )
+
+            if len(weights) == 1:
+                selected_sheet = next(iter(weights))
+                questions = all_questions[selected_sheet]
+
+                print(f"\n=== {selected_sheet} ===")
+                print(index.summary())
+
+                ask_questions(questions, [attempt_log.for_sheet(selected_sheet)])
+                continue
+
+            total = sum(len(all_questions[sheet]) for sheet in weights)
+            count = input(f"How many questions (1-{total}, default all)? ").strip()
+            count = int(count) if count.isdigit() else total
+            pairs = weighted_sample(all_questions, weights, count)
+            print(f"\n=== {len(weights)} sheets mixed ===")
+            print(index.summary())
+
+            by_sheet = {q.id: sheet for sheet, q in pairs}
+            ask_questions([q for _, q in pairs], [attempt_log.for_sheet(by_sheet)])
+    finally:
+        # A lazy workbook writes the sheets it parsed to the cache on close
+        if hasattr(all_questions, "close"):
+            all_questions.close()
 
 
 if __name__ == "__main__":
@@ -1,9 +1,9 @@
-import pandas as pd
-import random
 import os
-from openpyxl import load_workbook
 from tkinter import *
 from tkinter import filedialog, messagebox
+from bank_cache import QuestionCache
+from quiz_engine import QuizSession
+from xlsx_loader import load_workbook_questions
 
 
 class QuizApp:
@@ -13,14 +13,14 @@ class QuizApp:
         self.center_window(650, 600)
         self.root.resizable(False, False)
         self.file_path = None
-        self.questions = []
-        self.current_question_index = 0
-        self.incorrect_count = 0
+        self.session = None
         self.all_questions = {}
         self.options_var = StringVar()
         self.options = []
+        self.cache = QuestionCache()
 
         self.init_ui()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def center_window(self, width, height):
         screen_width = self.root.winfo_screenwidth()
@@ -82,96 +82,42 @@ class QuizApp:
             self.load_sheets()
 
     def load_sheets(self):
-        xls = pd.ExcelFile(self.file_path)
-        self.all_questions = {
-            sheet: self.process_sheet(sheet, self.file_path)
-            for sheet in xls.sheet_names
-        }
+        self.close_bank()
+        self.all_questions = load_workbook_questions(
+            self.file_path, lazy=True, cache=self.cache
+        )
         self.sheet_var.set("")
         menu = self.sheet_menu["menu"]
         menu.delete(0, "end")
-        for sheet in xls.sheet_names:
+        for sheet in self.all_questions:
             menu.add_command(
                 label=sheet, command=lambda value=sheet: self.sheet_var.set(value)
             )
 
-    def process_sheet(self, sheet, file_path):
-        df = pd.read_excel(file_path, sheet)
-        wb = load_workbook(file_path, data_only=True)
-        ws = wb[sheet]
-
-        questions = []
-        current_question = None
-        choices = []
-        correct_answer = None
-
-        for index, row in df.iterrows():
-            cell_index = index + 2  # Adjust for zero-based index and header row
-            if not pd.isnull(row.iloc[0]):  # New question
-                if current_question:  # Save the previous question
-                    questions.append(
-                        {
-                            "question": current_question,
-                            "choices": choices,
-                            "correct_answer": correct_answer,
-                        }
-                    )
-                    current_question = None
-                    choices = []
-                    correct_answer = None
-
-                current_question = row.iloc[1]
-            choices.append(row.iloc[2])
-            if self.get_correct_answer(
-                ws, cell_index, 3
-            ):  # Check the color of the answer cell
-                correct_answer = len(choices) - 1  # Update the correct answer index
-
-        if current_question:  # Save the last question
-            questions.append(
-                {
-                    "question": current_question,
-                    "choices": choices,
-                    "correct_answer": correct_answer,
-                }
-            )
-
-        return questions
-
-    def get_correct_answer(self, ws, row, col):
-        cell = ws.cell(row=row, column=col)
-        return (
-            cell.fill.bgColor.index != "00000000"
-            or cell.fill.fgColor.index != "00000000"
-        )
-
     def start_quiz(self):
         selected_sheet = self.sheet_var.get()
         if not selected_sheet:
             messagebox.showerror("Error", "Please select a sheet")
             return
-        self.questions = self.all_questions[selected_sheet]
-        random.shuffle(self.questions)
-        self.current_question_index = 0
-        self.incorrect_count = 0
+        self.session = QuizSession(
+            self.all_questions[selected_sheet], shuffle_questions=True
+        )
         self.display_question()
 
     def display_question(self):
         for widget in self.options_frame.winfo_children():
             widget.destroy()
 
-        if self.current_question_index >= len(self.questions):
+        if self.session.finished():
             self.show_result()
             return
 
-        q = self.questions[self.current_question_index]
-        self.question_label.config(
-            text=f"Q{self.current_question_index + 1}: {q['question']}"
-        )
+        q = self.session.current()
+        self.question_label.config(text=f"Q{self.session.index + 1}: {q.question}")
         self.options_var.set(None)
 
         self.options = []
-        for i, choice in enumerate(q["choices"]):
+        for i, choice in enumerate(self.session.shown_choices()):
             rb = Radiobutton(
                 self.options_frame,
                 text=f"{chr(65 + i)}. {choice}",
@@ -193,32 +139,42 @@ class QuizApp:
             return
 
         selected_option = int(self.options_var.get())
-        correct_option = self.questions[self.current_question_index]["correct_answer"]
+        q = self.session.current()
 
-        if selected_option == correct_option:
+        if self.session.submit(selected_option):
             self.result_label.config(text="Correct!", fg="green")
         else:
             self.result_label.config(
-                text=f"Incorrect! The correct answer is {chr(65 + correct_option)}",
+                text=f"Incorrect! The correct answer is {self.session.answer_letters()}"
+                if q.correct_answers
+                else "Incorrect! There is no correct answer for this question.",
                 fg="red",
             )
-            self.incorrect_count += 1
 
         self.submit_button.config(state=DISABLED)
         self.next_button.config(state=NORMAL)
 
     def next_question(self):
         self.result_label.config(text="")
-        self.current_question_index += 1
+        self.session.next()
         self.display_question()
 
     def show_result(self):
         self.question_label.config(text="")
         self.result_label.config(
-            text=f"You got {self.incorrect_count} out of {len(self.questions)} questions incorrect.",
+            text=f"You got {self.session.incorrect_count} out of {self.session.total()} questions incorrect.",
             fg="blue",
         )
 
+    def close_bank(self):
+        # Writes the sheets parsed so far to the cache
+        if self.all_questions:
+            self.all_questions.close()
+
+    def on_close(self):
+        self.close_bank()
+        self.root.destroy()
+
 
 if __name__ == "__main__":
     root = Tk()
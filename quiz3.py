@@ -1,12 +1,96 @@
-from docx import Document
-from docx.oxml.ns import qn
-import pandas as pd
-import random
 import os
-from openpyxl import load_workbook
+import random
+import time
 from tkinter import *
 from tkinter import filedialog, messagebox
 from PIL import Image, ImageTk
+from background import BackgroundLoader
+from bank_cache import QuestionCache
+from bank_file import SUFFIX, MappedBank
+from dedup import QuestionIndex, index_sheets
+from docx_loader import load_word_document
+from history import AttemptLog
+from library import Library
+from quiz_engine import QuizSession, select_questions, weighted_sample
+from scheduler import ReviewStore, Scheduler
+from search import SearchIndex
+from xlsx_loader import load_workbook_questions
+
+
+class QuestionPanel:
+    """
+    A question label and its option rows. QuizApp keeps two of them, so the
+    next question can be laid out in the hidden one while the current one
+    is on screen.
+    """
+
+    def __init__(self, master, variable):
+        self.frame = Frame(master)
+        self.variable = variable
+        self.option_rows = []
+        self.shown_options = 0
+
+        self.question_label = Label(
+            self.frame,
+            text="",
+            wraplength=800,
+            font=("Cambria", 14, "bold"),
+            justify="left",
+        )
+        self.question_label.pack(pady=10)
+
+        self.options_frame = Frame(self.frame)
+        self.options_frame.pack(pady=10)
+
+    def option_row(self, i):
+        """Returns the i-th option row, creating it on first use."""
+        while len(self.option_rows) <= i:
+            frame = Frame(self.options_frame)
+
+            label = Label(frame, font=("Cambria", 14, "bold"), bg="white")
+            label.pack(side="left")
+
+            rb = Radiobutton(
+                frame,
+                font=("Cambria", 14),
+                variable=self.variable,
+                anchor="w",
+                wraplength=800,
+                justify="left",
+                indicatoron=False,
+                # height=3,
+                width=810,
+                selectcolor="#C6FFFD",
+                bg="white",
+            )
+            rb.pack(side="left", fill="x")
+
+            self.option_rows.append((frame, label, rb))
+        return self.option_rows[i]
+
+    def show_options(self, count):
+        """Packs the first count option rows and hides the others."""
+        for frame, _, _ in self.option_rows[count : self.shown_options]:
+            frame.pack_forget()
+        # Rows are always shown and hidden from the end, so packing order holds
+        for frame, _, _ in self.option_rows[self.shown_options : count]:
+            frame.pack(fill="x", anchor="w", padx=5)
+        self.shown_options = count
+
+    def show_question(self, number, question, choices):
+        # Configuring a label wraps its text straight away, even while hidden
+        self.question_label.config(
+            text=f"Q{number}: {question}",
+            font=("Cambria", 14, "bold"),
+            anchor="w",
+            justify="left",
+            wraplength=800,
+        )
+        for i, choice in enumerate(choices):
+            _, label, rb = self.option_row(i)
+            label.config(text=f"{chr(65 + i)}.")
+            rb.config(text=choice, value=str(i))
+        self.show_options(len(choices))
 
 
 class QuizApp:
@@ -16,15 +100,20 @@ class QuizApp:
         self.center_window(900, 700)
         self.root.resizable(False, False)
         self.file_path = None
-        self.questions = []
-        self.current_question_index = 0
-        self.incorrect_count = 0
-        self.incorrect_questions = []
+        self.session = None
+        self.review_store = None
+        self.attempt_log = AttemptLog()
         self.all_questions = {}
         self.options_var = StringVar()
-        self.options = []
+        self.prerendered = None  # (session, index) laid out in the hidden panel
+        self.cache = QuestionCache()
+        self.index = QuestionIndex()
+        self.search_index = SearchIndex()
+        self.loader = None
+        self.wanted_sheet = None
 
         self.init_ui()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def center_window(self, width, height):
         screen_width = self.root.winfo_screenwidth()
@@ -48,6 +137,23 @@ class QuizApp:
         )
         self.load_button.pack(side=LEFT, padx=5)
 
+        self.folder_button = Button(
+            top_frame,
+            text="Load Folder",
+            command=self.choose_folder,
+            font=("Cambria", 12),
+        )
+        self.folder_button.pack(side=LEFT, padx=5)
+
+        self.cancel_button = Button(
+            top_frame,
+            text="Cancel",
+            command=self.cancel_loading,
+            state=DISABLED,
+            font=("Cambria", 12),
+        )
+        self.cancel_button.pack(side=LEFT, padx=5)
+
         self.sheet_label = Label(
             top_frame, text="Select a sheet:", font=("Cambria", 12, "italic")
         )
@@ -102,22 +208,63 @@ class QuizApp:
         )
         self.shuffle_check.pack(side=LEFT, padx=5)
 
+        self.review_var = BooleanVar(value=False)
+        self.review_check = Checkbutton(
+            middle_frame, text="Spaced Rep.", variable=self.review_var, font=("Cambria", 12)
+        )
+        self.review_check.pack(side=LEFT, padx=5)
+
+        self.seed_label = Label(middle_frame, text="Seed:", font=("Cambria", 12))
+        self.seed_label.pack(side=LEFT, padx=5)
+
+        self.seed_entry = Entry(middle_frame, font=("Cambria", 12), width=6)
+        self.seed_entry.pack(side=LEFT, padx=5)
+
         self.start_button = Button(
-            middle_frame, text="Start Quiz", command=self.start_quiz, font=("Cambria", 12)
+            middle_frame,
+            text="Start Quiz",
+            command=self.start_quiz,
+            state=DISABLED,
+            font=("Cambria", 12),
         )
         self.start_button.pack(side=LEFT, padx=5)
 
-        self.question_label = Label(
-            self.root,
-            text="",
-            wraplength=800,
-            font=("Cambria", 14, "bold"),
-            justify="left",
+        self.weakest_button = Button(
+            middle_frame,
+            text="Weakest",
+            command=self.start_weakest,
+            state=DISABLED,
+            font=("Cambria", 12),
         )
-        self.question_label.pack(pady=10)
+        self.weakest_button.pack(side=LEFT, padx=5)
 
-        self.options_frame = Frame(self.root)
-        self.options_frame.pack(pady=10)
+        self.mix_button = Button(
+            middle_frame, text="Mix...", command=self.open_mix, font=("Cambria", 12)
+        )
+        self.mix_button.pack(side=LEFT, padx=5)
+
+        # Frame for searching the loaded questions
+        search_frame = Frame(self.root)
+        search_frame.pack(pady=5)
+
+        self.search_entry = Entry(search_frame, font=("Cambria", 12), width=40)
+        self.search_entry.pack(side=LEFT, padx=5)
+        self.search_entry.bind("<Return>", lambda event: self.start_search())
+
+        self.search_button = Button(
+            search_frame, text="Search", command=self.start_search, font=("Cambria", 12)
+        )
+        self.search_button.pack(side=LEFT, padx=5)
+
+        self.status_label = Label(self.root, text="", font=("Cambria", 10, "italic"))
+        self.status_label.pack()
+
+        # The question on screen and the next one, laid out in advance
+        panel_frame = Frame(self.root)
+        panel_frame.pack()
+        self.panels = [QuestionPanel(panel_frame, self.options_var) for _ in range(2)]
+        self.panel = self.panels[0]
+        self.panel.frame.pack()
 
         # Frame for Submit and Next buttons
         bottom_frame = Frame(self.root)
@@ -155,163 +302,195 @@ class QuizApp:
 
     def choose_file(self):
         self.file_path = filedialog.askopenfilename(
-            filetypes=[("Word and Excel files", "*.docx *.xlsx")]
+            filetypes=[
+                ("Word and Excel files", "*.docx *.xlsx"),
+                ("Exported banks", f"*{SUFFIX}"),
+            ]
         )
         if self.file_path:
             self.file_label.config(text=os.path.basename(self.file_path))
             self.load_questions()
 
+    def choose_folder(self):
+        directory = filedialog.askdirectory()
+        if directory:
+            self.file_path = directory
+            self.file_label.config(text=os.path.basename(directory) + "/")
+            self.load_questions()
+
     def load_questions(self):
+        if self.loader is not None:
+            self.loader.cancel()
         self.all_questions = {}
-        if self.file_path.endswith(".xlsx"):
-            self.load_sheets()
-        elif self.file_path.endswith(".docx"):
-            self.load_word_document()
-            total_questions = sum(len(all_questions) for all_questions in self.all_questions.values())
-            self.total_questions_label.config(text=f"Total: {total_questions}")
-
-    def load_sheets(self):
-        xls = pd.ExcelFile(self.file_path)
-        self.all_questions = {
-            sheet: self.process_sheet(sheet, self.file_path)
-            for sheet in xls.sheet_names
-        }
+        self.wanted_sheet = None
+        # Loaders already running keep adding to the index they started with
+        self.search_index = SearchIndex()
         self.sheet_var.set("")
+        self.sheet_menu["menu"].delete(0, "end")
+        self.start_button.config(state=DISABLED)
+        self.weakest_button.config(state=DISABLED)
+        self.total_questions_label.config(text="Total: 0")
+        if os.path.isdir(self.file_path):
+            self.start_loader(self.load_library, self.file_path)
+        elif self.file_path.endswith(".xlsx"):
+            self.start_loader(self.load_sheets, self.file_path)
+        elif self.file_path.endswith(".docx"):
+            self.start_loader(self.load_docx, self.file_path)
+        elif self.file_path.endswith(SUFFIX):
+            self.start_loader(self.load_mapped, self.file_path)
+
+    def start_loader(self, target, *args):
+        self.loader = BackgroundLoader(lambda loader: target(loader, *args))
+        self.loader.start()
+        self.cancel_button.config(state=NORMAL)
+        self.status_label.config(text="Loading...")
+        self.root.after(100, self.poll_loader, self.loader)
+
+    def cancel_loading(self):
+        if self.loader is not None:
+            self.loader.cancel()
+
+    def poll_loader(self, loader):
+        running = loader.is_running()
+        for kind, *payload in loader.poll():
+            if loader is not self.loader:
+                continue  # A newer file has been chosen since
+            if kind == "sheets":
+                self.show_sheets(payload[0])
+            elif kind == "questions":
+                self.all_questions = payload[0]
+                self.on_sheet_select("Word Document")
+            elif kind == "skipped":
+                failures = "\n".join(f"{rel}: {e}" for rel, e in payload[0].items())
+                messagebox.showwarning("Warning", f"Could not load:\n{failures}")
+            elif kind == "progress":
+                done, total, unit = payload
+                self.status_label.config(
+                    text=f"Loaded {done}/{total} {unit} ({loader.elapsed():.1f}s)"
+                )
+                self.update_start_button()
+            elif kind == "done":
+                self.status_label.config(
+                    text=f"Loaded in {loader.elapsed():.1f}s: {self.index.summary()}"
+                )
+            elif kind == "cancelled":
+                self.status_label.config(text="Loading cancelled")
+            elif kind == "error":
+                self.status_label.config(text="")
+                messagebox.showerror("Error", f"Could not load file: {payload[0]}")
+        if running:
+            self.root.after(100, self.poll_loader, loader)
+        elif loader is self.loader:
+            self.loader = None
+            self.cancel_button.config(state=DISABLED)
+            self.update_start_button()
+
+    def load_sheets(self, loader, file_path):
+        # Runs on the loader thread
+        bank = load_workbook_questions(
+            file_path, lazy=True, cache=self.cache, index=self.index
+        )
+        loader.report("sheets", bank)
+        self.parse_sheets(loader, bank, list(bank))
+
+    def load_mapped(self, loader, file_path):
+        # Runs on the loader thread. Questions are read from the mapped file
+        # as they are needed, so they are not added to the indexes
+        loader.report("sheets", MappedBank(file_path))
+
+    def load_library(self, loader, directory):
+        # Runs on the loader thread; only files changed since the last scan of
+        # this directory are parsed again
+        search_index = self.search_index
+        library = Library(directory)
+        library.scan(progress=loader.progress)
+        catalogue = library.catalogue(self.index)
+        for name, questions in catalogue.items():
+            search_index.add(questions, directory, name)
+        if library.errors:
+            loader.report("skipped", dict(library.errors))
+        loader.report("sheets", catalogue)
+
+    def parse_sheets(self, loader, bank, sheets):
+        # Runs on the loader thread. Whichever sheet is picked in the menu,
+        # even halfway through, is parsed next; the rest in parallel
+        search_index = self.search_index
+        pending = [sheet for sheet in sheets if not bank.is_parsed(sheet)]
+        for sheet in sheets:
+            if bank.is_parsed(sheet):
+                search_index.add(bank[sheet], bank.file_path, sheet)
+        done = len(sheets) - len(pending)
+        loader.progress(done, len(sheets), "sheets")
+        for sheet in bank.prefetch(pending, priority=lambda: self.wanted_sheet):
+            search_index.add(bank[sheet], bank.file_path, sheet)
+            done += 1
+            loader.progress(done, len(sheets), "sheets")
+
+    def show_sheets(self, bank):
+        self.all_questions = bank
         menu = self.sheet_menu["menu"]
         menu.delete(0, "end")
-        for sheet in xls.sheet_names:
+        for sheet in bank:
             menu.add_command(
                 label=sheet, command=lambda value=sheet: self.on_sheet_select(value)
             )
 
-    def on_sheet_select(self, value):
-        self.sheet_var.set(value)
-        total_questions = len(self.all_questions[value])
-        self.total_questions_label.config(text=f"Total: {total_questions}")
-
-
-    def process_sheet(self, sheet, file_path):
-        df = pd.read_excel(file_path, sheet)
-        wb = load_workbook(file_path, data_only=True)
-        ws = wb[sheet]
-
-        questions = []
-        current_question = None
-        choices = []
-        correct_answer = None
-
-        for index, row in df.iterrows():
-            cell_index = index + 2  # Adjust for zero-based index and header row
-            if not pd.isnull(row.iloc[0]):  # New question
-                if current_question:  # Save the previous question
-                    questions.append(
-                        {
-                            "question": current_question,
-                            "choices": [
-                                choice for choice in choices if not pd.isnull(choice)
-                            ],
-                            "correct_answer": correct_answer,
-                        }
-                    )
-                    current_question = None
-                    choices = []
-                    correct_answer = None
-
-                current_question = row.iloc[1]
-            if not pd.isnull(row.iloc[2]):
-                choices.append(row.iloc[2])
-                if self.get_correct_answer(
-                    ws, cell_index, 3
-                ):  # Check the color of the answer cell
-                    correct_answer = len(choices) - 1  # Update the correct answer index
-
-        if current_question:  # Save the last question
-            questions.append(
-                {
-                    "question": current_question,
-                    "choices": [choice for choice in choices if not pd.isnull(choice)],
-                    "correct_answer": correct_answer,
-                }
-            )
-
-        return questions
-
-    def get_correct_answer(self, ws, row, col):
-        cell = ws.cell(row=row, column=col)
-        return (
-            cell.fill.bgColor.index != "00000000"
-            or cell.fill.fgColor.index != "00000000"
-        )
-
-    def load_word_document(self):
-        doc = Document(self.file_path)
-        questions = []
-        current_question = None
-        choices = []
-        correct_answer = None
-
-        def has_shading_or_highlight(run):
-            if run.font.highlight_color is not None:
-                return True
-            if run._element is not None and run._element.rPr is not None:
-                shading = run._element.rPr.find(qn("w:shd"))
-                if shading is not None:
-                    return True
+    def is_sheet_ready(self, sheet):
+        if sheet not in self.all_questions:
             return False
+        is_parsed = getattr(self.all_questions, "is_parsed", None)
+        return is_parsed is None or is_parsed(sheet)
 
-        bool_ques = False
-        for para in doc.paragraphs:
-            # Check if the paragraph is part of a question (bold text)
-            if all(run.bold for run in para.runs):
-                if bool_ques:
-                    questions.append(
-                        {
-                            "question": current_question,
-                            "choices": choices,
-                            "correct_answer": correct_answer,
-                        }
-                    )
-                    current_question = None
-                    choices = []
-                    correct_answer = None
-                    bool_ques = False
-                if current_question is None:
-                    current_question = para.text.strip()
-                else:
-                    current_question += "\n" + para.text.strip()
-            else:
-                bool_ques = True
-                # Check if the choice has shading or highlight
-                if any(has_shading_or_highlight(run) for run in para.runs):
-                    correct_answer = len(choices)
-                choices.append(para.text.strip())
-
-        if current_question:  # Save the last question
-            questions.append(
-                {
-                    "question": current_question,
-                    "choices": choices,
-                    "correct_answer": correct_answer,
-                }
-            )
-
-        self.all_questions["Word Document"] = questions
-        self.sheet_var.set("Word Document")
+    def on_sheet_select(self, value):
+        self.sheet_var.set(value)
+        self.wanted_sheet = value
+        if not self.is_sheet_ready(value) and self.loader is None:
+            self.start_loader(self.parse_sheets, self.all_questions, [value])
+        self.update_start_button()
+
+    def update_start_button(self):
+        sheet = self.sheet_var.get()
+        if not sheet:
+            return
+        if self.is_sheet_ready(sheet):
+            total_questions = len(self.all_questions[sheet])
+            self.total_questions_label.config(text=f"Total: {total_questions}")
+            self.start_button.config(state=NORMAL)
+            self.weakest_button.config(state=NORMAL)
+        else:
+            self.total_questions_label.config(text="Total: ...")
+            self.start_button.config(state=DISABLED)
+            self.weakest_button.config(state=DISABLED)
+
+    def load_docx(self, loader, file_path):
+        # Runs on the loader thread
+        search_index = self.search_index
+        key = self.cache.key(file_path)
+        cached = self.cache.get(key)
+        if cached is not None:
+            all_questions = cached[1]
+        else:
+            questions = load_word_document(file_path, loader.progress)
+            all_questions = {"Word Document": questions}
+            self.cache.put(key, list(all_questions), all_questions)
+        all_questions = index_sheets(all_questions, file_path, self.index)
+        for sheet, questions in all_questions.items():
+            search_index.add(questions, file_path, sheet)
+        loader.report("questions", all_questions)
 
     def start_quiz(self):
         selected_sheet = self.sheet_var.get()
         if not selected_sheet:
             messagebox.showerror("Error", "Please select a sheet")
             return
-        self.questions = self.all_questions[selected_sheet]
+        questions = self.all_questions[selected_sheet]
 
         # Get number of questions to ask
-        # num_questions = len(self.questions)
         num_questions_str = self.num_questions_entry.get()
         if num_questions_str.isdigit():
             num_questions = int(num_questions_str)
         else:
-            num_questions = len(self.questions)
+            num_questions = None
         
         # Get start and end questions
         start_question_str = self.start_question_entry.get()
@@ -324,75 +503,214 @@ class QuizApp:
         if end_question_str.isdigit():
             end_question = int(end_question_str)
         else:
-            end_question = len(self.questions)
-        
-        if start_question < 0 or end_question > len(self.questions) or start_question >= end_question:
-            messagebox.showerror("Error", "Invalid question range")
+            end_question = None
+
+        rng = self.seeded_rng()
+        review = self.review_var.get()
+        try:
+            selected = select_questions(
+                questions,
+                start_question,
+                end_question,
+                None if review else num_questions,
+                rng=rng,
+            )
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
             return
-        
-        self.questions = self.questions[start_question:end_question]
-        
-        if num_questions > len(self.questions):
-            num_questions = len(self.questions)
 
-        self.questions = self.questions[:num_questions]  # Select the required number of questions
-        
-        if self.shuffle_var.get():  # Check if shuffle is enabled
-            self.questions = random.sample(self.questions, len(self.questions))
-        
-        self.current_question_index = 0
-        self.incorrect_count = 0
-        self.incorrect_questions = []
+        listeners = [self.attempt_log.for_sheet(selected_sheet)]
+        if review:
+            self.start_review(selected, num_questions, listeners)
+            return
+
+        self.session = QuizSession(
+            selected,
+            shuffle_questions=self.shuffle_var.get(),
+            rng=rng,
+            listeners=listeners,
+        )
         self.display_question()
 
-    def display_question(self):
-        for widget in self.options_frame.winfo_children():
-            widget.destroy()
+    def seeded_rng(self):
+        # The same seed draws the same questions in the same order
+        seed_str = self.seed_entry.get().strip()
+        return random.Random(int(seed_str)) if seed_str.isdigit() else None
 
-        if self.current_question_index >= len(self.questions):
-            self.show_result()
+    def open_mix(self):
+        """Opens a dialog to build one quiz from several weighted sheets."""
+        ready = [sheet for sheet in self.all_questions if self.is_sheet_ready(sheet)]
+        if not ready:
+            messagebox.showerror("Error", "No sheets are loaded yet")
             return
+        dialog = Toplevel(self.root)
+        dialog.title("Mix Sheets")
+        weights = {}
+
+        list_frame = Frame(dialog)
+        list_frame.pack(padx=10, pady=5, fill=BOTH, expand=True)
+        scrollbar = Scrollbar(list_frame)
+        scrollbar.pack(side=RIGHT, fill=Y)
+        listbox = Listbox(
+            list_frame,
+            selectmode=EXTENDED,
+            width=60,
+            height=15,
+            font=("Cambria", 12),
+            yscrollcommand=scrollbar.set,
+        )
+        listbox.pack(side=LEFT, fill=BOTH, expand=True)
+        scrollbar.config(command=listbox.yview)
+        for sheet in ready:
+            listbox.insert(END, sheet)
+
+        controls = Frame(dialog)
+        controls.pack(pady=5)
+        Label(controls, text="Weight:", font=("Cambria", 12)).pack(side=LEFT, padx=5)
+        weight_entry = Entry(controls, font=("Cambria", 12), width=5)
+        weight_entry.insert(0, "1")
+        weight_entry.pack(side=LEFT, padx=5)
+
+        def set_weight():
+            try:
+                weight = float(weight_entry.get())
+            except ValueError:
+                weight = -1
+            if weight < 0:
+                messagebox.showerror("Error", "Invalid weight", parent=dialog)
+                return
+            for i in listbox.curselection():
+                weights[ready[i]] = weight
+                listbox.delete(i)
+                listbox.insert(i, f"{weight:g} × {ready[i]}" if weight else ready[i])
+
+        def start():
+            if not any(weights.values()):
+                messagebox.showerror(
+                    "Error", "Select some sheets and set their weight", parent=dialog
+                )
+                return
+            dialog.destroy()
+            self.start_mix(weights)
+
+        Button(
+            controls, text="Set Weight", command=set_weight, font=("Cambria", 12)
+        ).pack(side=LEFT, padx=5)
+        Button(controls, text="Start Quiz", command=start, font=("Cambria", 12)).pack(
+            side=LEFT, padx=5
+        )
 
-        q = self.questions[self.current_question_index]
-        self.question_label.config(
-            text=f"Q{self.current_question_index + 1}: {q['question']}",
-            font=("Cambria", 14, "bold"),
-            anchor="w",
-            justify="left",
-            wraplength=800,
+    def start_mix(self, weights):
+        """Starts a quiz drawn from several sheets in proportion to weights."""
+        num_questions_str = self.num_questions_entry.get()
+        if num_questions_str.isdigit():
+            num_questions = int(num_questions_str)
+        else:
+            num_questions = sum(len(self.all_questions[sheet]) for sheet in weights)
+        rng = self.seeded_rng()
+        pairs = weighted_sample(self.all_questions, weights, num_questions, rng)
+        if not pairs:
+            messagebox.showerror("Error", "No questions to ask")
+            return
+        sheets = {q.id: sheet for sheet, q in pairs}
+        self.session = QuizSession(
+            [q for _, q in pairs],
+            rng=rng,
+            listeners=[self.attempt_log.for_sheet(sheets)],
         )
-        self.options_var.set(None)  # Reset the options variable to None
+        self.display_question()
 
-        choices = list(enumerate(q["choices"]))
+    def start_search(self):
+        """Starts a quiz of the loaded questions that match the search box."""
+        query = self.search_entry.get().strip()
+        if not query:
+            return
+        start = time.perf_counter()
+        hits = self.search_index.search(query)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.status_label.config(
+            text=f"{len(hits)} questions match '{query}' ({elapsed:.1f} ms)"
+        )
+        if not hits:
+            messagebox.showinfo("Search", f"No questions match '{query}'")
+            return
 
-        self.options = []
-        for i, (original_idx, choice) in enumerate(choices):
-            frame = Frame(self.options_frame)
-            frame.pack(fill="x", anchor="w", padx=5)
+        sheets = {q.id: sheet for sheet, q in hits}
+        self.session = QuizSession(
+            [q for _, q in hits],
+            shuffle_questions=self.shuffle_var.get(),
+            listeners=[self.attempt_log.for_sheet(sheets)],
+        )
+        self.display_question()
 
-            label = Label(
-                frame, text=f"{chr(65 + i)}.", font=("Cambria", 14, "bold"), bg="white"
+    def start_weakest(self):
+        """Starts a quiz of the sheet's questions most often answered wrongly."""
+        selected_sheet = self.sheet_var.get()
+        if not selected_sheet:
+            messagebox.showerror("Error", "Please select a sheet")
+            return
+        num_questions_str = self.num_questions_entry.get()
+        limit = int(num_questions_str) if num_questions_str.isdigit() else 20
+
+        by_id = {q.id: q for q in self.all_questions[selected_sheet]}
+        self.attempt_log.flush()
+        if self.attempt_log.error is not None:
+            messagebox.showwarning(
+                "Weakest",
+                f"Recent answers could not be saved: {self.attempt_log.error}",
             )
-            label.pack(side="left")
+        weakest = [
+            by_id[row[0]]
+            for row in self.attempt_log.weakest(selected_sheet, limit)
+            if row[0] in by_id
+        ]
+        if not weakest:
+            messagebox.showinfo("Weakest", "No wrong answers recorded for this sheet yet")
+            return
 
-            rb = Radiobutton(
-                frame,
-                text=choice,
-                font=("Cambria", 14),
-                variable=self.options_var,
-                value=str(original_idx),
-                anchor="w",
-                wraplength=800,
-                justify="left",
-                indicatoron=False,
-                # height=3,
-                width=810,
-                selectcolor="#C6FFFD",
-                bg="white",
+        self.session = QuizSession(
+            weakest, listeners=[self.attempt_log.for_sheet(selected_sheet)]
+        )
+        self.display_question()
+
+    def start_review(self, questions, num_questions, listeners=()):
+        """Starts a quiz of the questions that are due for spaced repetition."""
+        if self.review_store is None:
+            self.review_store = ReviewStore()
+        scheduler = Scheduler(self.review_store, questions)
+        due = scheduler.take_due(num_questions or len(scheduler))
+        if not due:
+            next_due = time.strftime(
+                "%d/%m/%Y %H:%M", time.localtime(scheduler.next_due_time())
             )
-            rb.pack(side="left", fill="x")
+            messagebox.showinfo("Spaced Repetition", f"Nothing is due until {next_due}")
+            return
 
-            self.options.append(rb)
+        self.session = QuizSession(due, listeners=[scheduler, *listeners])
+        self.display_question()
+
+    def spare_panel(self):
+        return self.panels[1] if self.panel is self.panels[0] else self.panels[0]
+
+    def display_question(self):
+        prerendered, self.prerendered = self.prerendered, None
+        if self.session.finished():
+            self.show_result()
+            return
+
+        self.options_var.set(None)  # Reset the options variable to None
+        if prerendered == (self.session, self.session.index):
+            # Laid out while the last answer was shown, only swap it in
+            spare = self.spare_panel()
+            self.panel.frame.pack_forget()
+            spare.frame.pack()
+            self.panel = spare
+        else:
+            self.panel.show_question(
+                self.session.index + 1,
+                self.session.current().question,
+                self.session.shown_choices(),
+            )
 
         self.submit_button.config(state=NORMAL)
         self.next_button.config(state=DISABLED)
@@ -400,66 +718,74 @@ class QuizApp:
 
     def submit_answer(self):
         selected_option = self.options_var.get()
-        correct_option = self.questions[self.current_question_index]["correct_answer"]
+        q = self.session.current()
 
         if (selected_option is None) or (selected_option == "") or (selected_option == "None"):
+            selected_option = None
+        else:
+            selected_option = int(selected_option)
+
+        if self.session.submit(selected_option):
+            self.result_label.config(
+                text="Correct!", fg="green", font=("Cambria", 14, "bold")
+            )
+        else:
             self.result_label.config(
-                text=f"Incorrect! The correct answer is {chr(65 + correct_option)}" if correct_option is not None else "Incorrect! There is no correct answer for this question.",
+                text=f"Incorrect! The correct answer is {self.session.answer_letters()}" if q.correct_answers else "Incorrect! There is no correct answer for this question.",
                 fg="red",
                 font=("Cambria", 14, "bold"),
             )
-            self.incorrect_count += 1
-            self.incorrect_questions.append(self.questions[self.current_question_index])
-        else:
-            selected_option = int(selected_option)
-            if selected_option == correct_option:
-                self.result_label.config(
-                    text="Correct!", fg="green", font=("Cambria", 14, "bold")
-                )
-            else:
-                self.result_label.config(
-                    text=f"Incorrect! The correct answer is {chr(65 + correct_option)}" if correct_option is not None else "Incorrect! There is no correct answer for this question.",
-                    fg="red",
-                    font=("Cambria", 14, "bold"),
-                )
-                self.incorrect_count += 1
-                self.incorrect_questions.append(self.questions[self.current_question_index])
 
         self.submit_button.config(state=DISABLED)
         self.next_button.config(state=NORMAL)
+        # Runs once the feedback has been drawn
+        self.root.after_idle(self.prerender_next, self.session)
+
+    def prerender_next(self, session):
+        """Lays out the question after the current one in the hidden panel."""
+        if session is not self.session or not session.answered:
+            return
+        upcoming = session.prefetch()
+        if upcoming is None:
+            return
+        index, q, choices = upcoming
+        self.spare_panel().show_question(index + 1, q.question, choices)
+        self.prerendered = (session, index)
 
     def next_question(self):
         self.result_label.config(text="")
-        self.current_question_index += 1
+        self.session.next()
         self.display_question()
 
     def show_result(self):
-        total_questions = len(self.questions)
-        correct_answers = total_questions - self.incorrect_count
-        score_percentage = (correct_answers / total_questions) * 100
+        total_questions = self.session.total()
+        correct_answers = self.session.correct_count()
+        score_percentage = self.session.score_percentage()
 
-        self.question_label.config(
+        self.panel.question_label.config(
             text=f"Quiz Completed!\n\nTotal Questions: {total_questions}\nCorrect Answers: {correct_answers}\nScore: {score_percentage:.2f}%", font=('Cambria', 14, 'bold')
         )
 
-        for widget in self.options_frame.winfo_children():
-            widget.destroy()
+        self.panel.show_options(0)
 
         self.submit_button.config(state=DISABLED)
         self.next_button.config(state=DISABLED)
 
-        if self.incorrect_questions:
+        if self.session.incorrect_questions:
             self.retry_button.config(state=NORMAL)
 
     def retry_incorrect(self):
-        self.questions = self.incorrect_questions
-        if self.shuffle_var.get():  # Check if shuffle is enabled
-            random.shuffle(self.questions)
-        self.current_question_index = 0
-        self.incorrect_count = 0
-        self.incorrect_questions = []
-        self.display_question()
-
+        self.session.shuffle_questions = self.shuffle_var.get()
+        if self.session.retry_incorrect():
+            self.display_question()
+
+    def on_close(self):
+        if self.loader is not None:
+            self.loader.cancel()
+        self.attempt_log.close()
+        if self.review_store is not None:
+            self.review_store.close()
+        self.root.destroy()
 
 
 if __name__ == "__main__":
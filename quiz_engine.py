@@ -0,0 +1,365 @@
+import random
+import time
+from collections.abc import Sequence
+
+
+class QuestionView(Sequence):
+    """
+    Read-only view of some questions of a bank, picked by index.
+
+    Selecting questions builds one of these instead of copying them, so a
+    selection costs as much as its indices: nothing for a range, O(k) for a
+    sample of k.
+
+    Args:
+        questions (Sequence): The bank, e.g. one sheet of all_questions.
+        indices (Sequence): Indices into questions, e.g. a range.
+    """
+
+    def __init__(self, questions, indices):
+        self.questions = questions
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return QuestionView(self.questions, self.indices[i])
+        return self.questions[self.indices[i]]
+
+    def __repr__(self):
+        return f"QuestionView({len(self.indices)} of {len(self.questions)})"
+
+
+def select_questions(
+    questions, start=0, end=None, count=None, shuffle=False, rng=None
+):
+    """
+    Picks the questions for a quiz from a bank.
+
+    Args:
+        questions (Sequence): The bank, e.g. one sheet of all_questions.
+        start (int, optional): Index of the first question, zero-based.
+        end (int, optional): Index after the last question. Defaults to the
+            end of the bank.
+        count (int, optional): Draw count questions of the range uniformly
+            at random, in O(count). Defaults to the whole range.
+        shuffle (bool, optional): Whether to shuffle the selection; without
+            it a sample keeps the order of the bank.
+        rng (random.Random, optional): Source of randomness; a seeded one
+            makes the selection reproducible.
+
+    Returns:
+        QuestionView: A view of the selection; the bank itself is never
+            copied or reordered.
+
+    Raises:
+        ValueError: If the range is empty or outside the bank.
+    """
+    if end is None:
+        end = len(questions)
+    if start < 0 or end > len(questions) or start >= end:
+        raise ValueError("Invalid question range")
+
+    rng = rng or random
+    indices = range(start, end)
+    if count is not None and count < len(indices):
+        # sample() only tracks the picks for a large range, it does not copy it
+        indices = rng.sample(indices, max(count, 0))
+        if not shuffle:
+            indices.sort()
+    elif shuffle:
+        indices = list(indices)
+        rng.shuffle(indices)
+    return QuestionView(questions, indices)
+
+
+def stratified_sample(sheets, count, shuffle=True, rng=None):
+    """
+    Draws count questions across several sheets, each sheet contributing in
+    proportion to its size.
+
+    Quotas are rounded by largest remainder, so they add up to count, and
+    each sheet's quota is drawn with select_questions.
+
+    Args:
+        sheets (dict): {sheet: questions}, e.g. all_questions.
+        count (int): How many questions to draw; at most all of them.
+        shuffle (bool, optional): Mix the sheets together rather than
+            keeping them in order.
+        rng (random.Random, optional): Source of randomness.
+
+    Returns:
+        list: (sheet, question) pairs.
+    """
+    rng = rng or random
+    sizes = {sheet: len(questions) for sheet, questions in sheets.items()}
+    total = sum(sizes.values())
+    count = min(count, total)
+    if count <= 0:
+        return []
+    quotas = {sheet: count * size // total for sheet, size in sizes.items()}
+    by_remainder = sorted(
+        sizes, key=lambda sheet: count * sizes[sheet] % total, reverse=True
+    )
+    for sheet in by_remainder[: count - sum(quotas.values())]:
+        quotas[sheet] += 1
+
+    pairs = []
+    for sheet, quota in quotas.items():
+        if quota:
+            selected = select_questions(sheets[sheet], count=quota, rng=rng)
+            pairs.extend((sheet, q) for q in selected)
+    if shuffle:
+        rng.shuffle(pairs)
+    return pairs
+
+
+class AliasTable:
+    """
+    Draws indices with probability proportional to their weights in O(1),
+    after an O(n) setup (Vose's alias method).
+
+    Args:
+        weights (list): Non-negative weights, not all zero.
+    """
+
+    def __init__(self, weights):
+        n = len(weights)
+        total = sum(weights)
+        if n == 0 or total <= 0:
+            raise ValueError("Weights must not all be zero")
+        scaled = [w * n / total for w in weights]
+        self.probability = [1.0] * n
+        self.alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1]
+        large = [i for i, p in enumerate(scaled) if p >= 1]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.probability[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1 - scaled[s]
+            (small if scaled[l] < 1 else large).append(l)
+        # Whatever is left is 1 up to rounding and keeps its own column
+
+    def draw(self, rng):
+        i = rng.randrange(len(self.alias))
+        return i if rng.random() < self.probability[i] else self.alias[i]
+
+
+def weighted_sample(sheets, weights, count, rng=None):
+    """
+    Draws count distinct questions across sheets, a question of a sheet
+    being weights[sheet] times as likely as one of a sheet of weight 1.
+
+    A sheet is picked with an alias table over weight * questions left,
+    then one of its questions left uniformly. The questions left of a sheet
+    are a Fisher-Yates shuffle done lazily: only the positions swapped so
+    far are stored, so each draw is O(1) and no question is drawn twice.
+    As sheets shrink, a draw from the table is kept with probability
+    questions left / questions when the table was built, and the table is
+    rebuilt once half its weight is used up. That is exact weighted
+    sampling without replacement in O(count + number of sheets * log
+    count), even when count is all of the questions, and it never copies or
+    concatenates the sheets.
+
+    Args:
+        sheets (dict): {sheet: questions}, from one or several files.
+        weights (dict): {sheet: weight}; sheets missing or of weight 0 are
+            left out.
+        count (int): How many questions to draw; at most all of those in
+            the weighted sheets.
+        rng (random.Random, optional): Source of randomness.
+
+    Returns:
+        list: (sheet, question) pairs in the order they were drawn.
+
+    Raises:
+        ValueError: If a weight is negative.
+    """
+    rng = rng or random
+    if any(weight < 0 for weight in weights.values()):
+        raise ValueError("Weights must not be negative")
+    names = [
+        sheet for sheet, weight in weights.items() if weight > 0 and sheets[sheet]
+    ]
+    left = {sheet: len(sheets[sheet]) for sheet in names}
+    count = min(count, sum(left.values()))
+    # Position -> index of the question now there, for positions swapped
+    swapped = {sheet: {} for sheet in names}
+    pairs = []
+    while len(pairs) < count:
+        names = [sheet for sheet in names if left[sheet]]
+        built = [left[sheet] for sheet in names]
+        masses = [weights[sheet] * n for sheet, n in zip(names, built)]
+        table = AliasTable(masses)
+        mass = total = sum(masses)
+        while len(pairs) < count and 2 * mass >= total:
+            k = table.draw(rng)
+            sheet = names[k]
+            n = left[sheet]
+            if n < built[k] and rng.random() * built[k] >= n:
+                continue
+            positions = swapped[sheet]
+            j = rng.randrange(n)
+            i = positions.get(j, j)
+            positions[j] = positions.pop(n - 1, n - 1)
+            left[sheet] = n - 1
+            mass -= weights[sheet]
+            pairs.append((sheet, sheets[sheet][i]))
+    return pairs
+
+
+class QuizSession:
+    """
+    State of one quiz, independent of how it is shown.
+
+    A front end shows current() with its choices in the order given by
+    order, passes the position the user picked to submit(), then calls
+    next() until finished(). Positions are indices into order, so letters
+    are chr(65 + position); submit(None) records a question left unanswered.
+    While the feedback on an answer is shown, prefetch() gives the next
+    question as it will be shown, so a front end can lay it out early.
+
+    Attributes:
+        questions (list): The questions of the current round.
+        index (int): Position of the current question in questions.
+        order (list): Original choice index shown at each position of the
+            current question.
+        incorrect_count (int): Wrong or unanswered questions this round.
+        incorrect_questions (list): Those questions, for retry_incorrect.
+        listeners (list): Objects whose answered(question, choice, correct,
+            latency) is called after every submit, with the original index of
+            the picked choice (or None) and the seconds since the question
+            was prepared; e.g. a scheduler.Scheduler.
+    """
+
+    def __init__(
+        self,
+        questions,
+        shuffle_questions=False,
+        shuffle_choices=False,
+        rng=None,
+        listeners=(),
+    ):
+        self.shuffle_questions = shuffle_questions
+        self.shuffle_choices = shuffle_choices
+        self.rng = rng or random.Random()
+        self.listeners = list(listeners)
+        self.start_round(questions)
+
+    def start_round(self, questions):
+        self.questions = list(questions)
+        if self.shuffle_questions:
+            self.rng.shuffle(self.questions)
+        self.index = 0
+        self.incorrect_count = 0
+        self.incorrect_questions = []
+        self.answered = False
+        self._upcoming = None
+        self._prepare()
+
+    def _choice_order(self, q):
+        order = list(range(len(q.choices))) if q is not None else []
+        if self.shuffle_choices:
+            self.rng.shuffle(order)
+        return order
+
+    def _prepare(self):
+        upcoming, self._upcoming = self._upcoming, None
+        if upcoming is not None and upcoming[0] == self.index:
+            self.order = upcoming[1]
+        else:
+            self.order = self._choice_order(self.current())
+        self.answered = False
+        self.shown_at = time.monotonic()
+
+    def current(self):
+        """Returns the current question, or None once the quiz is finished."""
+        if self.index < len(self.questions):
+            return self.questions[self.index]
+        return None
+
+    def finished(self):
+        return self.index >= len(self.questions)
+
+    def submit(self, position):
+        """
+        Scores the answer to the current question.
+
+        Args:
+            position (int): Position of the picked choice in order, or None
+                if the question was skipped.
+
+        Returns:
+            bool: Whether the answer is correct.
+        """
+        q = self.current()
+        if q is None or self.answered:
+            raise RuntimeError("No question waiting for an answer")
+        choice = self.order[position] if position is not None else None
+        correct = choice is not None and q.is_correct(choice)
+        if not correct:
+            self.incorrect_count += 1
+            self.incorrect_questions.append(q)
+        self.answered = True
+        latency = time.monotonic() - self.shown_at
+        for listener in self.listeners:
+            listener.answered(q, choice, correct, latency)
+        return correct
+
+    def shown_choices(self):
+        """The current question's choices in the order they are shown."""
+        choices = self.current().choices
+        return [choices[i] for i in self.order]
+
+    def answer_letters(self):
+        """Letters of the correct answers as currently shown, e.g. "A, C"."""
+        return self.current().answer_letters(self.order)
+
+    def prefetch(self):
+        """
+        Draws the next question's choice order ahead of next(), which then
+        reuses it; the random draws happen in the same order either way.
+
+        Returns:
+            tuple: (index, question, shown choices) of the next question, or
+                None if the current one is the last.
+        """
+        i = self.index + 1
+        if i >= len(self.questions):
+            return None
+        q = self.questions[i]
+        if self._upcoming is None or self._upcoming[0] != i:
+            self._upcoming = (i, self._choice_order(q))
+        return i, q, [q.choices[j] for j in self._upcoming[1]]
+
+    def next(self):
+        """Moves to the next question and returns it, or None at the end."""
+        self.index += 1
+        self._prepare()
+        return self.current()
+
+    def total(self):
+        return len(self.questions)
+
+    def correct_count(self):
+        return len(self.questions) - self.incorrect_count
+
+    def score_percentage(self):
+        if not self.questions:
+            return 0.0
+        return self.correct_count() / len(self.questions) * 100
+
+    def retry_incorrect(self):
+        """
+        Starts a new round with the questions answered wrongly in this one.
+
+        Returns:
+            bool: False, and nothing changes, if there were none.
+        """
+        if not self.incorrect_questions:
+            return False
+        self.start_round(self.incorrect_questions)
+        return True
@@ -0,0 +1,439 @@
+"""
+Multi-user quiz server over HTTP/JSON.
+
+Usage:
+    python quiz_server.py serve plnn.xlsx [--port 8080]
+    python quiz_server.py load [--port 8080] [--users 200] [--questions 20]
+
+API:
+    GET    /banks                      {"sheets": {sheet: question count}}
+    POST   /sessions                   {"sheet", "start", "end", "count",
+                                        "shuffle", "shuffle_choices", "seed"}
+                                        or {"sheets": {sheet: weight}, "count",
+                                        ...} to mix sheets, or {"sheets":
+                                        [sheet, ...], "stratified": true, ...}
+                                        to draw from each in proportion to
+                                        its size
+                                        -> {"session", "total"}
+    GET    /sessions/<id>/question     the current question, or the score
+    POST   /sessions/<id>/answer       {"choice": position or null}
+    DELETE /sessions/<id>
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import secrets
+import statistics
+import time
+
+from bank_cache import QuestionCache
+from bank_file import SUFFIX, MappedBank
+from dedup import QuestionIndex, index_sheets
+from quiz_engine import (
+    QuizSession,
+    select_questions,
+    stratified_sample,
+    weighted_sample,
+)
+
+# Sessions untouched for this long are dropped
+SESSION_TTL = 60 * 60
+MAX_BODY_BYTES = 64 * 1024
+REASONS = {
+    200: "OK",
+    201: "Created",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def load_bank(file_path, index=None):
+    """
+    Returns {sheet: questions} for an xlsx, docx, PDF or exported bank file.
+
+    Exported banks are memory-mapped rather than loaded, so server processes
+    serving the same file share its pages; they bypass the index.
+    """
+    from xlsx_loader import load_workbook_questions
+
+    if file_path.endswith(SUFFIX):
+        return MappedBank(file_path)
+    if file_path.endswith(".xlsx"):
+        return load_workbook_questions(file_path, cache=QuestionCache(), index=index)
+    if file_path.endswith(".docx"):
+        from docx_loader import load_word_document
+
+        all_questions = {"Word Document": load_word_document(file_path)}
+    elif file_path.endswith(".pdf"):
+        from pdf_loader import load_pdf_questions
+
+        all_questions = {"PDF": load_pdf_questions(file_path)}
+    else:
+        raise ValueError(f"Unsupported file type: {file_path}")
+    return index_sheets(all_questions, file_path, index)
+
+
+class QuizServer:
+    """
+    Serves quiz sessions over one shared, read-only question bank.
+
+    The bank is loaded once and every session only holds its own selection
+    of references into it, so thousands of sessions cost little beyond the
+    bank itself. Everything runs on one event loop: each request is a few
+    dictionary lookups and QuizSession calls, with no blocking work.
+
+    Args:
+        all_questions (dict): {sheet: questions}, as the loaders return.
+    """
+
+    def __init__(self, all_questions):
+        self.all_questions = all_questions
+        self.sessions = {}
+        self.last_used = {}
+        self.requests = 0
+
+    async def start(self, host="127.0.0.1", port=8080):
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    def expire_sessions(self):
+        cutoff = time.monotonic() - SESSION_TTL
+        for session_id in [s for s, t in self.last_used.items() if t < cutoff]:
+            del self.sessions[session_id]
+            del self.last_used[session_id]
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                keep_alive = True
+                try:
+                    method, path, headers = parse_head(head)
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                    length = int(headers.get("content-length", 0))
+                    if length > MAX_BODY_BYTES:
+                        raise HTTPError(413, "Request body too large")
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = self.dispatch(method, path, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except (ValueError, TypeError) as e:
+                    status, payload = 400, {"error": str(e)}
+                except asyncio.IncompleteReadError:
+                    break
+                writer.write(http_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def dispatch(self, method, path, body):
+        """Routes one request; returns (status, payload)."""
+        self.requests += 1
+        parts = path.split("?", 1)[0].strip("/").split("/")
+        if parts == ["banks"]:
+            if method != "GET":
+                raise HTTPError(405, "Use GET")
+            return 200, {
+                "sheets": {
+                    sheet: len(questions)
+                    for sheet, questions in self.all_questions.items()
+                }
+            }
+        if parts == ["sessions"]:
+            if method != "POST":
+                raise HTTPError(405, "Use POST")
+            return self.create_session(parse_json(body))
+        if len(parts) >= 2 and parts[0] == "sessions":
+            session = self.sessions.get(parts[1])
+            if session is None:
+                raise HTTPError(404, "No such session")
+            self.last_used[parts[1]] = time.monotonic()
+            action = parts[2] if len(parts) == 3 else None
+            if action is None and method == "DELETE":
+                del self.sessions[parts[1]]
+                del self.last_used[parts[1]]
+                return 200, {}
+            if action == "question" and method == "GET":
+                return 200, question_payload(session)
+            if action == "answer" and method == "POST":
+                return self.answer(session, parse_json(body))
+            raise HTTPError(405, "Unsupported method for this resource")
+        raise HTTPError(404, "Not found")
+
+    def create_session(self, options):
+        seed = options.get("seed")
+        rng = random.Random(seed) if seed is not None else None
+        if "sheets" in options:
+            selected = self.mix_sheets(
+                options["sheets"],
+                options.get("count"),
+                rng,
+                options.get("stratified", False),
+            )
+        else:
+            sheet = options.get("sheet")
+            if sheet not in self.all_questions:
+                raise HTTPError(404, f"No such sheet: {sheet}")
+            start = options.get("start", 1) - 1
+            selected = select_questions(
+                self.all_questions[sheet],
+                start,
+                options.get("end"),
+                options.get("count"),
+                rng=rng,
+            )
+        self.expire_sessions()
+        session_id = secrets.token_urlsafe(12)
+        self.sessions[session_id] = QuizSession(
+            selected,
+            shuffle_questions=options.get("shuffle", True),
+            shuffle_choices=options.get("shuffle_choices", False),
+            rng=rng,
+        )
+        self.last_used[session_id] = time.monotonic()
+        return 201, {"session": session_id, "total": len(selected)}
+
+    def mix_sheets(self, weights, count, rng, stratified=False):
+        """
+        Draws count questions from several sheets by weight or, stratified,
+        from each sheet in proportion to its size; weights may then be just
+        a list of sheet names.
+        """
+        if not isinstance(weights, dict) and not (
+            stratified and isinstance(weights, list)
+        ):
+            raise HTTPError(400, "sheets must map sheet names to weights")
+        for sheet in weights:
+            if sheet not in self.all_questions:
+                raise HTTPError(404, f"No such sheet: {sheet}")
+        if count is None:
+            count = sum(len(self.all_questions[sheet]) for sheet in weights)
+        if stratified:
+            sheets = {sheet: self.all_questions[sheet] for sheet in weights}
+            pairs = stratified_sample(sheets, count, rng=rng)
+        else:
+            pairs = weighted_sample(self.all_questions, weights, count, rng)
+        if not pairs:
+            raise HTTPError(400, "No questions to ask")
+        return [q for _, q in pairs]
+
+    def answer(self, session, options):
+        if session.finished():
+            raise HTTPError(409, "The quiz is finished")
+        choice = options.get("choice")
+        q = session.current()
+        if choice is not None and not 0 <= choice < len(q.choices):
+            raise HTTPError(400, "Choice out of range")
+        try:
+            correct = session.submit(choice)
+        except RuntimeError as e:
+            raise HTTPError(409, str(e))
+        payload = {"correct": correct, "answer": session.answer_letters()}
+        session.next()
+        return 200, payload
+
+
+def question_payload(session):
+    if session.finished():
+        return {
+            "finished": True,
+            "total": session.total(),
+            "correct": session.correct_count(),
+            "score": session.score_percentage(),
+        }
+    return {
+        "finished": False,
+        "index": session.index,
+        "total": session.total(),
+        "question": session.current().question,
+        "choices": session.shown_choices(),
+    }
+
+
+def parse_json(body):
+    """Decodes a request body that must be a JSON object, if present."""
+    options = json.loads(body or b"{}")
+    if not isinstance(options, dict):
+        raise HTTPError(400, "Expected a JSON object")
+    return options
+
+
+def parse_head(head):
+    """Splits a request head into (method, path, lowercased headers)."""
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, path, _ = lines[0].split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "Malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    return method, path, headers
+
+
+def http_response(status, payload, keep_alive=True):
+    body = json.dumps(payload, ensure_ascii=False).encode()
+    head = (
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode() + body
+
+
+class Client:
+    """Minimal keep-alive JSON client used by the load generator."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method, path, payload=None):
+        body = b"" if payload is None else json.dumps(payload).encode()
+        self.writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode()
+            + body
+        )
+        await self.writer.drain()
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        status = int(head.split(b" ", 2)[1])
+        _, _, headers = parse_head(head)
+        data = await self.reader.readexactly(int(headers["content-length"]))
+        return status, json.loads(data)
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def run_user(host, port, sheet, questions, latencies, rng):
+    """One simulated learner: starts a session and answers it to the end."""
+    client = Client(host, port)
+    await client.connect()
+    try:
+
+        async def timed_request(method, path, payload=None):
+            start = time.perf_counter()
+            status, data = await client.request(method, path, payload)
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                raise RuntimeError(f"{method} {path}: {status} {data}")
+            return data
+
+        created = await timed_request(
+            "POST", "/sessions", {"sheet": sheet, "count": questions}
+        )
+        session = f"/sessions/{created['session']}"
+        while True:
+            q = await timed_request("GET", f"{session}/question")
+            if q["finished"]:
+                break
+            choice = rng.randrange(len(q["choices"])) if q["choices"] else None
+            await timed_request("POST", f"{session}/answer", {"choice": choice})
+        await timed_request("DELETE", session)
+    finally:
+        await client.close()
+
+
+async def run_load(host="127.0.0.1", port=8080, users=200, questions=20, seed=0):
+    """
+    Runs users concurrent quiz sessions against a server.
+
+    Returns:
+        dict: Request count, wall time, requests per second and the p50 and
+            p99 request latency in milliseconds.
+    """
+    client = Client(host, port)
+    await client.connect()
+    _, banks = await client.request("GET", "/banks")
+    await client.close()
+    sheets = [sheet for sheet, count in banks["sheets"].items() if count]
+
+    rng = random.Random(seed)
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            run_user(host, port, rng.choice(sheets), questions, latencies, rng)
+            for _ in range(users)
+        )
+    )
+    elapsed = time.perf_counter() - start
+    cuts = statistics.quantiles(latencies, n=100)
+    return {
+        "requests": len(latencies),
+        "seconds": elapsed,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": cuts[49] * 1000,
+        "p99_ms": cuts[98] * 1000,
+    }
+
+
+def print_load(result):
+    print(
+        f"{result['requests']} requests in {result['seconds']:.2f}s"
+        f" ({result['rps']:.0f}/s), p50 {result['p50_ms']:.2f} ms,"
+        f" p99 {result['p99_ms']:.2f} ms"
+    )
+
+
+async def serve(file_path, host, port):
+    index = QuestionIndex()
+    server = QuizServer(load_bank(file_path, index))
+    listener = await server.start(host, port)
+    print(f"Serving {file_path} on http://{host}:{port}: {index.summary()}")
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="serve a question bank")
+    serve_parser.add_argument("file")
+    load_parser = commands.add_parser("load", help="load-test a running server")
+    load_parser.add_argument("--users", type=int, default=200)
+    load_parser.add_argument("--questions", type=int, default=20)
+    for sub in (serve_parser, load_parser):
+        sub.add_argument("--host", default="127.0.0.1")
+        sub.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args.file, args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+    else:
+        print_load(
+            asyncio.run(run_load(args.host, args.port, args.users, args.questions))
+        )
+
+
+if __name__ == "__main__":
+    main()
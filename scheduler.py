@@ -0,0 +1,213 @@
+import heapq
+import os
+import struct
+import time
+
+from util import atomic_write
+
+DEFAULT_DATA_DIR = os.path.join(
+    os.path.expanduser("~"), ".local", "share", "plnnstudy"
+)
+DAY = 24 * 60 * 60
+MIN_EASE = 1.3
+# card id, ease, interval in days, repetitions, lapses, due (epoch seconds)
+RECORD = struct.Struct("<8sffHHd")
+# Rewrite the review log once it holds this many times more records than cards
+COMPACT_RATIO = 4
+
+
+def data_dir():
+    return os.environ.get("PLNN_DATA_DIR", DEFAULT_DATA_DIR)
+
+
+class Card:
+    """SM-2 learning state of one question."""
+
+    __slots__ = ("ease", "interval", "reps", "lapses", "due")
+
+    def __init__(self, ease=2.5, interval=0.0, reps=0, lapses=0, due=0.0):
+        self.ease = ease
+        self.interval = interval
+        self.reps = reps
+        self.lapses = lapses
+        self.due = due
+
+    def reviewed(self, quality, now):
+        """
+        Returns the card's state after a review, following SM-2.
+
+        Args:
+            quality (int): 0 (blackout) to 5 (perfect recall); below 3 the
+                card starts over.
+            now (float): Time of the review, in epoch seconds.
+        """
+        if quality >= 3:
+            if self.reps == 0:
+                interval = 1.0
+            elif self.reps == 1:
+                interval = 6.0
+            else:
+                interval = round(self.interval * self.ease)
+            reps, lapses = self.reps + 1, self.lapses
+        else:
+            interval, reps, lapses = 1.0, 0, self.lapses + 1
+        ease = self.ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+        return Card(max(MIN_EASE, ease), interval, reps, lapses, now + interval * DAY)
+
+
+class ReviewStore:
+    """
+    Learning state of every reviewed question, kept in an append-only log.
+
+    Each review appends one fixed-size record, so saving costs the same
+    however many cards there are. Loading replays the log and keeps the
+    last record per card; once the log holds COMPACT_RATIO times more
+    records than cards it is rewritten with one record per card.
+
+    Args:
+        path (str, optional): Log file. Defaults to review.log in the data
+            directory, PLNN_DATA_DIR or ~/.local/share/plnnstudy.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(data_dir(), "review.log")
+        self.cards = {}
+        self.records = 0
+        self._file = None
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # A torn last record from a crash is ignored
+        usable = len(data) - len(data) % RECORD.size
+        for card_id, *state in RECORD.iter_unpack(memoryview(data)[:usable]):
+            self.cards[card_id] = Card(*state)
+        self.records = usable // RECORD.size
+        if usable != len(data):
+            self.compact()
+
+    def get(self, card_id):
+        return self.cards.get(card_id)
+
+    def put(self, card_id, card):
+        self.cards[card_id] = card
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "ab")
+        self._file.write(
+            RECORD.pack(
+                card_id, card.ease, card.interval, card.reps, card.lapses, card.due
+            )
+        )
+        self._file.flush()
+        self.records += 1
+        if self.records > COMPACT_RATIO * len(self.cards) + 1024:
+            self.compact()
+
+    def compact(self):
+        """Rewrites the log with only the latest record of each card."""
+        self.close()
+        with atomic_write(self.path) as f:
+            f.write(
+                b"".join(
+                    RECORD.pack(cid, c.ease, c.interval, c.reps, c.lapses, c.due)
+                    for cid, c in self.cards.items()
+                )
+            )
+        self.records = len(self.cards)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class Scheduler:
+    """
+    Due queue over a pool of questions, e.g. the sheets of a quiz.
+
+    Questions are kept in a heap by due time: building it is O(n) and
+    taking or rescheduling a question O(log n). Questions never reviewed
+    count as due when the queue is built, so they come in pool order after
+    the questions that were already overdue.
+
+    Args:
+        store (ReviewStore): Where learning state is read and saved.
+        questions (iterable): The pool; duplicates are merged.
+    """
+
+    def __init__(self, store, questions):
+        self.store = store
+        self.questions = {}
+        self._new_due = time.time()
+        heap = []
+        for seq, q in enumerate(questions):
+            card_id = q.id
+            if card_id in self.questions:
+                continue
+            self.questions[card_id] = q
+            card = store.get(card_id)
+            due = card.due if card is not None else self._new_due
+            heap.append((due, seq, card_id))
+        heapq.heapify(heap)
+        self._heap = heap
+        self._seq = len(heap)
+
+    def __len__(self):
+        return len(self.questions)
+
+    def _is_current(self, due, card_id):
+        card = self.store.get(card_id)
+        return due == (card.due if card is not None else self._new_due)
+
+    def _top(self):
+        """Drops stale heap entries; returns the live top entry or None."""
+        heap = self._heap
+        while heap and not self._is_current(heap[0][0], heap[0][2]):
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def next_due_time(self):
+        """Returns when the next question is due, None if the pool is empty."""
+        top = self._top()
+        return None if top is None else top[0]
+
+    def take_due(self, limit, now=None):
+        """
+        Removes and returns up to limit questions that are due, most overdue
+        first. They come back into the queue when reviewed.
+        """
+        now = time.time() if now is None else now
+        taken = []
+        while len(taken) < limit:
+            top = self._top()
+            if top is None or top[0] > now:
+                break
+            heapq.heappop(self._heap)
+            taken.append(self.questions[top[2]])
+        return taken
+
+    def review(self, q, quality, now=None):
+        """Records a review of q and requeues it at its new due time."""
+        now = time.time() if now is None else now
+        card_id = q.id
+        card = (self.store.get(card_id) or Card()).reviewed(quality, now)
+        self.store.put(card_id, card)
+        if card_id in self.questions:
+            heapq.heappush(self._heap, (card.due, self._seq, card_id))
+            self._seq += 1
+        return card
+
+    def answered(self, q, choice, correct, latency):
+        """QuizSession hook: grades an answer as an SM-2 quality and reviews q."""
+        if correct:
+            quality = 4
+        elif choice is None:
+            quality = 0
+        else:
+            quality = 1
+        self.review(q, quality)
@@ -0,0 +1,120 @@
+import bisect
+import re
+import threading
+import unicodedata
+
+WORD_RE = re.compile(r"\w+")
+
+
+def fold(text):
+    """
+    Folds Vietnamese text for matching: no case and no diacritics.
+
+    "Đáp án" and "dap an" both become "dap an".
+    """
+    text = unicodedata.normalize("NFD", text.casefold().replace("đ", "d"))
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def tokenize(text):
+    return WORD_RE.findall(fold(text))
+
+
+class SearchIndex:
+    """
+    Inverted index over the text of questions and their choices.
+
+    Sheets can be added one at a time while others are still being parsed;
+    add() and search() may run on different threads. Adding a sheet again,
+    e.g. after its file was edited and reloaded, replaces its questions.
+    Every query word must match. A word matches whole words, except the last
+    one or any word ending in "*", which match as prefixes, so results
+    follow the user's typing.
+    """
+
+    def __init__(self):
+        self.hits = []  # doc -> (sheet, question), None once replaced
+        self._postings = {}  # folded word -> set of docs
+        self._words = []  # sorted vocabulary, for prefix lookups
+        self._words_stale = False
+        self._sources = {}  # (source, sheet) -> (questions, docs)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(docs) for _, docs in self._sources.values())
+
+    def add(self, questions, source=None, sheet=None):
+        """
+        Indexes the questions of a sheet, replacing those indexed before for
+        the same (source, sheet) pair unless it is the same list again.
+        """
+        with self._lock:
+            previous = self._sources.get((source, sheet))
+            if previous is not None:
+                if previous[0] is questions:
+                    return
+                # Replaced docs stay in the postings and are skipped by search
+                for doc in previous[1]:
+                    self.hits[doc] = None
+            postings = self._postings
+            start = len(self.hits)
+            for q in questions:
+                doc = len(self.hits)
+                self.hits.append((sheet, q))
+                words = set(tokenize(str(q.question)))
+                for choice in q.choices:
+                    words.update(tokenize(str(choice)))
+                for word in words:
+                    docs = postings.get(word)
+                    if docs is None:
+                        postings[word] = docs = set()
+                        self._words_stale = True
+                    docs.add(doc)
+            self._sources[(source, sheet)] = (questions, range(start, len(self.hits)))
+
+    def _matching(self, word, prefix):
+        if not prefix:
+            return self._postings.get(word, set())
+        if self._words_stale:
+            self._words = sorted(self._postings)
+            self._words_stale = False
+        words = self._words
+        start = bisect.bisect_left(words, word)
+        stop = bisect.bisect_left(words, word + "\uffff")
+        if stop - start == 1:
+            return self._postings[words[start]]
+        docs = set()
+        for w in words[start:stop]:
+            docs |= self._postings[w]
+        return docs
+
+    def search(self, query, limit=None):
+        """
+        Returns (sheet, question) pairs matching every word of query, in the
+        order they were added, each question only once.
+        """
+        terms = query.split()
+        with self._lock:
+            matches = []
+            for i, term in enumerate(terms):
+                prefix = term.endswith("*") or i == len(terms) - 1
+                for word in tokenize(term):
+                    matches.append(self._matching(word, prefix))
+            if not matches:
+                return []
+            matches.sort(key=len)
+            docs = matches[0].intersection(*matches[1:])
+
+            results = []
+            seen = set()
+            for doc in sorted(docs):
+                if self.hits[doc] is None:
+                    continue
+                sheet, q = self.hits[doc]
+                if q.id in seen:
+                    continue
+                seen.add(q.id)
+                results.append((sheet, q))
+                if limit is not None and len(results) >= limit:
+                    break
+            return results
@@ -0,0 +1,84 @@
+"""
+Checks how the PDF parser resolves answer lines to choices.
+
+Usage:
+    python -m pytest test_pdf_loader.py
+"""
+
+import pytest
+
+pytest.importorskip("pymupdf")
+
+from pdf_loader import answer_index, extract_questions, resolve_answers  # noqa: E402
+
+CHOICES = ["Hà Nội", "Huế, Đà Nẵng", "Sài Gòn", "Cần Thơ"]
+
+
+def resolve(answers_text, choices=CHOICES):
+    return resolve_answers(answers_text, *answer_index(choices))
+
+
+def test_single_answer_by_text():
+    assert resolve(" Sài Gòn.") == ([2], [])
+
+
+def test_whole_line_is_one_choice():
+    assert resolve("Huế, Đà Nẵng") == ([1], [])
+
+
+def test_several_answers_by_text():
+    assert resolve("Hà Nội, Cần Thơ") == ([0, 3], [])
+
+
+def test_choice_containing_a_comma_among_several():
+    assert resolve("Hà Nội, Huế, Đà Nẵng, Sài Gòn") == ([0, 1, 2], [])
+
+
+def test_answers_by_letter():
+    assert resolve("a, c") == ([0, 2], [])
+    assert resolve("b d") == ([1, 3], [])
+
+
+def test_case_and_spacing_are_ignored():
+    assert resolve("  hà   nội ;") == ([0], [])
+
+
+def test_unresolved_parts_are_reported():
+    assert resolve("Hà Nội, Đà Lạt") == ([0], ["Đà Lạt"])
+
+
+def test_empty_answer():
+    assert resolve("  ") == ([], [])
+
+
+def test_multi_answer_lines_and_diagnostics():
+    lines = [
+        "Câu Hỏi 1",
+        "Chọn câu:",
+        "a. Hà Nội",
+        "b. Huế, Đà Nẵng",
+        "c. Sài",
+        "Gòn",
+        "The correct answers are: Hà Nội, Sài Gòn",
+        "Câu Hỏi 2",
+        "a. Đúng",
+        "b. Sai",
+        "Câu trả lời đúng là: Huế, Đà Nẵng",
+        "Câu Hỏi 3",
+        "a. Một",
+        "b. Hai",
+        "Đáp án chính xác là: b, Ba",
+    ]
+    diagnostics = []
+    questions = extract_questions(lines, diagnostics)
+    assert [q.choices for q in questions] == [
+        ("Hà Nội", "Huế, Đà Nẵng", "Sài Gòn"),
+        ("Một", "Hai"),
+    ]
+    assert [q.correct_answers for q in questions] == [(0, 2), (1,)]
+    # Question 2 has no matching answer and is left out
+    assert diagnostics == [
+        ("Câu Hỏi 2", "Huế"),
+        ("Câu Hỏi 2", "Đà Nẵng"),
+        ("Câu Hỏi 3", "Ba"),
+    ]
@@ -0,0 +1,87 @@
+"""
+Checks the weighted and stratified samplers of the quiz engine.
+
+Usage:
+    python -m pytest test_quiz_engine.py
+"""
+
+import random
+from collections import Counter
+
+import pytest
+
+from quiz_engine import AliasTable, stratified_sample, weighted_sample
+
+
+def sheets_of(sizes):
+    return {
+        sheet: [f"{sheet}{i}" for i in range(size)] for sheet, size in sizes.items()
+    }
+
+
+def test_alias_table_follows_weights():
+    table = AliasTable([1, 0, 3])
+    rng = random.Random(0)
+    draws = Counter(table.draw(rng) for _ in range(40000))
+    assert draws[1] == 0
+    assert abs(draws[2] / draws[0] - 3) < 0.15
+
+
+def test_alias_table_rejects_zero_weights():
+    with pytest.raises(ValueError):
+        AliasTable([0, 0])
+    with pytest.raises(ValueError):
+        AliasTable([])
+
+
+def test_weighted_sample_draws_distinct_questions():
+    sheets = sheets_of({"a": 30, "b": 50})
+    pairs = weighted_sample(sheets, {"a": 1, "b": 2}, 60, random.Random(1))
+    assert len(pairs) == 60
+    assert len({q for _, q in pairs}) == 60
+    assert all(q in sheets[sheet] for sheet, q in pairs)
+
+
+def test_weighted_sample_caps_count_at_the_weighted_sheets():
+    sheets = sheets_of({"a": 5, "b": 7, "c": 100})
+    pairs = weighted_sample(sheets, {"a": 1, "b": 3, "c": 0}, 1000, random.Random(2))
+    assert Counter(sheet for sheet, _ in pairs) == {"a": 5, "b": 7}
+    assert len({q for _, q in pairs}) == 12
+
+
+def test_weighted_sample_honours_weights():
+    # A question of b is three times as likely as one of a, at every draw
+    sheets = sheets_of({"a": 100, "b": 100})
+    rng = random.Random(3)
+    first = Counter(
+        weighted_sample(sheets, {"a": 1, "b": 3}, 1, rng)[0][0] for _ in range(20000)
+    )
+    assert abs(first["b"] / first["a"] - 3) < 0.2
+
+
+def test_weighted_sample_weighs_questions_not_sheets():
+    # Equal weights: a sheet is drawn in proportion to its size
+    sheets = sheets_of({"a": 10, "b": 30})
+    rng = random.Random(4)
+    first = Counter(
+        weighted_sample(sheets, {"a": 1, "b": 1}, 1, rng)[0][0] for _ in range(20000)
+    )
+    assert abs(first["b"] / first["a"] - 3) < 0.2
+
+
+def test_weighted_sample_rejects_negative_weights():
+    with pytest.raises(ValueError):
+        weighted_sample(sheets_of({"a": 3}), {"a": -1}, 1)
+
+
+def test_stratified_sample_quotas_follow_sheet_sizes():
+    sheets = sheets_of({"a": 12, "b": 38, "c": 0})
+    pairs = stratified_sample(sheets, 10, rng=random.Random(5))
+    assert Counter(sheet for sheet, _ in pairs) == {"a": 2, "b": 8}
+    assert len({q for _, q in pairs}) == 10
+
+
+def test_stratified_sample_caps_count():
+    sheets = sheets_of({"a": 3, "b": 4})
+    assert len(stratified_sample(sheets, 100, rng=random.Random(6))) == 7
+    assert stratified_sample(sheets, 0) == []
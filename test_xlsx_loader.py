@@ -0,0 +1,105 @@
+"""
+Checks the xlsx loader against the parser quiz3.py used before it, on the
+bundled plnn.xlsx.
+
+Usage:
+    python -m pytest test_xlsx_loader.py
+"""
+
+import pytest
+from openpyxl import load_workbook
+
+from bank_cache import QuestionCache
+from xlsx_loader import load_workbook_questions
+
+pd = pytest.importorskip("pandas")
+
+BANK = "plnn.xlsx"
+
+
+def get_correct_answer(ws, row, col):
+    cell = ws.cell(row=row, column=col)
+    return (
+        cell.fill.bgColor.index != "00000000" or cell.fill.fgColor.index != "00000000"
+    )
+
+
+def process_sheet(sheet, file_path):
+    """quiz3.QuizApp.process_sheet as it was before xlsx_loader existed."""
+    df = pd.read_excel(file_path, sheet)
+    wb = load_workbook(file_path, data_only=True)
+    ws = wb[sheet]
+
+    questions = []
+    current_question = None
+    choices = []
+    correct_answer = None
+
+    for index, row in df.iterrows():
+        cell_index = index + 2  # Adjust for zero-based index and header row
+        if not pd.isnull(row.iloc[0]):  # New question
+            if current_question:  # Save the previous question
+                questions.append(
+                    {
+                        "question": current_question,
+                        "choices": [
+                            choice for choice in choices if not pd.isnull(choice)
+                        ],
+                        "correct_answer": correct_answer,
+                    }
+                )
+                current_question = None
+                choices = []
+                correct_answer = None
+
+            current_question = row.iloc[1]
+        if not pd.isnull(row.iloc[2]):
+            choices.append(row.iloc[2])
+            if get_correct_answer(ws, cell_index, 3):
+                correct_answer = len(choices) - 1  # Update the correct answer index
+
+    if current_question:  # Save the last question
+        questions.append(
+            {
+                "question": current_question,
+                "choices": [choice for choice in choices if not pd.isnull(choice)],
+                "correct_answer": correct_answer,
+            }
+        )
+
+    return questions
+
+
+def as_baseline(questions):
+    """The old dict form; it kept only the last highlighted answer."""
+    return [
+        {
+            "question": q.question,
+            "choices": list(q.choices),
+            "correct_answer": q.correct_answers[-1] if q.correct_answers else None,
+        }
+        for q in questions
+    ]
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    sheets = pd.ExcelFile(BANK).sheet_names
+    return {sheet: process_sheet(sheet, BANK) for sheet in sheets}
+
+
+@pytest.mark.parametrize("low_memory", [False, True])
+def test_matches_baseline(baseline, low_memory):
+    all_questions = load_workbook_questions(BANK, low_memory=low_memory, workers=1)
+    assert list(all_questions) == list(baseline)
+    for sheet, questions in all_questions.items():
+        assert as_baseline(questions) == baseline[sheet], sheet
+
+
+def test_lazy_and_cached_match_baseline(baseline, tmp_path):
+    cache = QuestionCache(str(tmp_path))
+    for _ in range(2):  # Parsed, then read back from the cache
+        bank = load_workbook_questions(BANK, lazy=True, cache=cache)
+        for sheet in reversed(list(bank)):
+            assert as_baseline(bank[sheet]) == baseline[sheet], sheet
+        bank.close()
@@ -0,0 +1,56 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+
+def pool_size(tasks, workers=None):
+    """
+    Returns how many worker processes to run tasks with: workers, or the
+    number of CPUs, but never more than there are tasks. 1 means none.
+
+    A process pool takes longer to start than a small bank takes to parse,
+    so the loaders only ask for one past a size threshold of their own:
+    PARALLEL_MIN_BYTES of xlsx, PARALLEL_MIN_PAGES of PDF and
+    PARALLEL_MIN_FILES changed files in a library scan.
+    """
+    return max(1, min(workers or os.cpu_count() or 1, tasks))
+
+
+def process_pool(workers, initializer=None, initargs=()):
+    """
+    Returns a ProcessPoolExecutor whose worker processes are spawned.
+
+    spawn rather than fork: the Tk front end may be running other threads,
+    and a forked child would inherit whatever locks they hold.
+    """
+    return ProcessPoolExecutor(
+        workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=initializer,
+        initargs=initargs,
+    )
+
+
+@contextmanager
+def atomic_write(path):
+    """
+    Opens path for writing in binary mode, through a temporary file.
+
+    The temporary file replaces path only once the with block completes, so
+    readers see either the old file or the whole new one; if the block
+    raises, path is left as it was. The parent directory is created if
+    needed.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
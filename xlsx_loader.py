@@ -0,0 +1,378 @@
+import os
+from collections.abc import Mapping
+from concurrent.futures import as_completed
+
+from openpyxl import load_workbook
+from openpyxl.worksheet._read_only import ReadOnlyWorksheet
+
+from dedup import index_sheets
+from question import Question
+from util import pool_size, process_pool
+
+NO_FILL = "00000000"
+LOW_MEMORY = os.environ.get("PLNN_LOW_MEMORY") == "1"
+PARALLEL_MIN_BYTES = 2 * 1024 * 1024
+
+
+def is_highlighted(fill):
+    # tagname rather than isinstance, as a full-mode cell's fill is a StyleProxy
+    if fill.tagname == "gradientFill":
+        # A GradientFill has colour stops instead of fg/bg colours
+        return bool(fill.stop)
+    return fill.bgColor.index != NO_FILL or fill.fgColor.index != NO_FILL
+
+
+def highlight_table(ws):
+    """
+    Resolves once which style indices of a sheet's cells are highlighted.
+
+    Full-mode cells carry a fill id, read-only cells an index into the
+    workbook's cell style table; either way each distinct fill in the style
+    table is checked only once. The extra last entry is False and stands for
+    cells that have no style at all.
+
+    Args:
+        ws: The openpyxl worksheet, full or read-only.
+
+    Returns:
+        list: Whether each style index is highlighted.
+    """
+    wb = ws.parent
+    flags = [is_highlighted(fill) for fill in wb._fills]
+    if isinstance(ws, ReadOnlyWorksheet):
+        flags = [flags[style.fillId] for style in wb._cell_styles]
+    return flags + [False]
+
+
+def _iter_cells(ws):
+    """Yields (stt, question, answer, answer_style_index) per data row."""
+    read_only = isinstance(ws, ReadOnlyWorksheet)
+    for cells in ws.iter_rows(min_row=2, max_col=3):
+        if len(cells) < 3:
+            cells = tuple(cells) + (None,) * (3 - len(cells))
+        stt, question, answer = cells
+        if answer is None:
+            style = -1
+        elif read_only:
+            style = getattr(answer, "_style_id", -1)  # EmptyCell has no style
+        else:
+            style = answer._style.fillId
+        yield (
+            stt.value if stt is not None else None,
+            question.value if question is not None else None,
+            answer.value if answer is not None else None,
+            style,
+        )
+
+
+def iter_sheet_rows(ws):
+    """
+    Yields (stt, question, answer, highlighted) for each data row of a sheet.
+
+    The STT, question and answer columns are read in a single pass. Nothing
+    is kept once a row has been yielded, so with a read-only worksheet
+    memory use does not grow with the sheet.
+    """
+    table = highlight_table(ws)
+    for stt, question, answer, style in _iter_cells(ws):
+        yield stt, question, answer, table[style]
+
+
+def iter_questions(rows):
+    """
+    Groups sheet rows into questions, one row at a time.
+
+    A row with a value in the STT column starts a new question; every non-empty
+    answer cell below it is a choice, and the highlighted ones are the correct
+    answers. Each question is yielded as soon as the next one starts.
+
+    Args:
+        rows: Iterable of (stt, question, answer, highlighted) tuples.
+    """
+    current_question = None
+    choices = []
+    correct_answers = []
+
+    for stt, question, answer, highlighted in rows:
+        if stt is not None:  # New question
+            if current_question:  # Save the previous question
+                yield Question(current_question, choices, correct_answers)
+                choices = []
+                correct_answers = []
+
+            current_question = question
+        if answer is not None:
+            choices.append(answer)
+            if highlighted:
+                correct_answers.append(len(choices) - 1)
+
+    if current_question:  # Save the last question
+        yield Question(current_question, choices, correct_answers)
+
+
+def parse_sheet(ws):
+    """
+    Parses one worksheet, full or read-only, into a list of questions.
+
+    Returns:
+        list: The Questions of the sheet.
+    """
+    return list(iter_questions(iter_sheet_rows(ws)))
+
+
+def iter_workbook_questions(file_path, sheet):
+    """
+    Yields the questions of one sheet while streaming it from disk.
+
+    The workbook is opened read-only, so only the row being parsed is held in
+    memory; highlighted answers are detected as in the full load.
+
+    Args:
+        file_path (str): Path to the xlsx file.
+        sheet (str): Name of the sheet to read.
+    """
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        yield from iter_questions(iter_sheet_rows(wb[sheet]))
+    finally:
+        wb.close()
+
+
+_worker_wb = None
+
+
+def _init_worker(file_path):
+    global _worker_wb
+    _worker_wb = load_workbook(file_path, read_only=True, data_only=True)
+
+
+def _parse_worker_sheet(sheet):
+    return sheet, parse_sheet(_worker_wb[sheet])
+
+
+def parse_workers(file_path, sheets, workers=None):
+    """Returns how many worker processes to parse sheets with; 1 means none."""
+    if os.path.getsize(file_path) < PARALLEL_MIN_BYTES:
+        return 1
+    return pool_size(len(sheets), workers)
+
+
+def iter_parsed_sheets(file_path, sheets, workers=None):
+    """
+    Parses sheets of a workbook across a process pool.
+
+    Each worker process opens the workbook read-only once and then parses
+    whole sheets. Small files, single sheets and workers=1 are parsed in this
+    process instead.
+
+    Args:
+        file_path (str): Path to the xlsx file.
+        sheets (list): Names of the sheets to parse.
+        workers (int, optional): Number of worker processes. Defaults to the
+            number of CPUs.
+
+    Yields:
+        tuple: (sheet, questions) in the order the sheets finish.
+    """
+    if not sheets:
+        return
+    workers = parse_workers(file_path, sheets, workers)
+    if workers == 1:
+        wb = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            for sheet in sheets:
+                yield sheet, parse_sheet(wb[sheet])
+        finally:
+            wb.close()
+        return
+
+    executor = process_pool(workers, _init_worker, (file_path,))
+    try:
+        futures = [executor.submit(_parse_worker_sheet, sheet) for sheet in sheets]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+class LazyWorkbook(Mapping):
+    """
+    Sheet name -> questions mapping that parses each sheet on first access.
+
+    The sheet names come from the workbook metadata, so the sheet menu can be
+    filled in straight away; a sheet's rows are only read the first time it
+    is looked up, streamed from the workbook opened read-only, and the
+    result is kept for later lookups. With an index, every sheet goes
+    through QuestionIndex.add as it becomes available.
+
+    With a cache, the sheets parsed so far are written to it in one entry
+    when the last sheet is parsed, when a prefetch ends and on close(), not
+    after every sheet.
+    """
+
+    def __init__(self, file_path, cache=None, index=None):
+        self.file_path = file_path
+        self.index = index
+        self._cache = cache
+        self._wb = None
+        self._parsed = {}
+        self._unsaved = False  # Sheets parsed since the cache entry was written
+
+        cached = None
+        if cache is not None:
+            self._cache_key = cache.key(file_path)
+            cached = cache.get(self._cache_key)
+        if cached is not None:
+            self._sheet_names, parsed = cached
+            for sheet, questions in parsed.items():
+                self._add(sheet, questions, save=False)
+        else:
+            self._open()
+            self._sheet_names = list(self._wb.sheetnames)
+
+    def _open(self):
+        self._wb = load_workbook(self.file_path, read_only=True, data_only=True)
+
+    def _add(self, sheet, questions, save=True):
+        if self.index is not None:
+            questions = self.index.add(questions, self.file_path, sheet)
+        self._parsed[sheet] = questions
+        self._unsaved = self._unsaved or save
+
+    def save(self):
+        """Writes the sheets parsed so far to the cache, if any are new."""
+        if self._unsaved and self._cache is not None:
+            self._cache.put(self._cache_key, self._sheet_names, self._parsed)
+        self._unsaved = False
+
+    def __getitem__(self, sheet):
+        if sheet not in self._parsed:
+            if sheet not in self._sheet_names:
+                raise KeyError(sheet)
+            if self._wb is None:
+                self._open()
+            self._add(sheet, parse_sheet(self._wb[sheet]))
+            if len(self._parsed) == len(self._sheet_names):
+                self.close()
+        return self._parsed[sheet]
+
+    def __iter__(self):
+        return iter(self._sheet_names)
+
+    def __len__(self):
+        return len(self._sheet_names)
+
+    def is_parsed(self, sheet):
+        return sheet in self._parsed
+
+    def prefetch(self, sheets=None, workers=None, priority=None):
+        """
+        Parses several sheets at once, in parallel for large files.
+
+        Args:
+            sheets (list, optional): Sheets to parse. Defaults to all of them.
+            workers (int, optional): Passed on to iter_parsed_sheets.
+            priority (callable, optional): Asked for a sheet to parse next,
+                e.g. the one the user just picked, before each sheet; the
+                parallel path parses it in this process as soon as a worker
+                result comes in.
+
+        Yields:
+            str: The name of each sheet as soon as it is ready, once each.
+        """
+        if sheets is None:
+            sheets = self._sheet_names
+        pending = [sheet for sheet in sheets if sheet not in self._parsed]
+
+        def wanted():
+            sheet = priority() if priority is not None else None
+            return sheet if sheet in pending else None
+
+        try:
+            if parse_workers(self.file_path, pending, workers) == 1:
+                while pending:
+                    sheet = wanted() or pending[0]
+                    pending.remove(sheet)
+                    self[sheet]
+                    yield sheet
+                return
+
+            for sheet, questions in iter_parsed_sheets(
+                self.file_path, pending, workers
+            ):
+                if sheet in pending:
+                    pending.remove(sheet)
+                    self._add(sheet, questions)
+                    yield sheet
+                sheet = wanted()
+                if sheet is not None:
+                    pending.remove(sheet)
+                    self[sheet]
+                    yield sheet
+            if len(self._parsed) == len(self._sheet_names):
+                self.close()
+        finally:
+            # A stopped prefetch keeps what it parsed for next time
+            self.save()
+
+    def close(self):
+        """Closes the workbook and writes any newly parsed sheets to the cache."""
+        if self._wb is not None:
+            self._wb.close()
+            self._wb = None
+        self.save()
+
+
+def load_workbook_questions(
+    file_path, lazy=False, cache=None, low_memory=LOW_MEMORY, workers=None, index=None
+):
+    """
+    Opens an xlsx question bank once and parses every sheet.
+
+    Args:
+        file_path (str): Path to the xlsx file.
+        lazy (bool, optional): Return a LazyWorkbook that only parses a sheet
+            when it is first looked up. Defaults to False.
+        cache (QuestionCache, optional): On-disk cache to read parsed sheets
+            from and store them in. Defaults to None.
+        low_memory (bool, optional): Stream the workbook read-only instead of
+            loading its full object model. Defaults to True when the
+            PLNN_LOW_MEMORY environment variable is set to 1. A lazy
+            workbook is always read this way.
+        workers (int, optional): Number of processes to parse sheets with
+            when the file is large. Defaults to the number of CPUs; 1 always
+            parses in this process.
+        index (QuestionIndex, optional): Global index that every sheet is
+            added to, sharing questions repeated across sheets and files.
+
+    Returns:
+        dict: Sheet name -> list of Questions, in workbook order.
+    """
+    if lazy:
+        return LazyWorkbook(file_path, cache, index)
+
+    if cache is not None:
+        key = cache.key(file_path)
+        cached = cache.get(key)
+        if cached is not None and len(cached[1]) == len(cached[0]):
+            sheet_names, parsed = cached
+            return index_sheets(
+                {sheet: parsed[sheet] for sheet in sheet_names}, file_path, index
+            )
+
+    if workers != 1 and os.path.getsize(file_path) >= PARALLEL_MIN_BYTES:
+        wb = load_workbook(file_path, read_only=True)
+        sheet_names = list(wb.sheetnames)
+        wb.close()
+        parsed = dict(iter_parsed_sheets(file_path, sheet_names, workers))
+        all_questions = {sheet: parsed[sheet] for sheet in sheet_names}
+    else:
+        wb = load_workbook(file_path, read_only=low_memory, data_only=True)
+        try:
+            all_questions = {ws.title: parse_sheet(ws) for ws in wb.worksheets}
+        finally:
+            wb.close()
+
+    if cache is not None:
+        cache.put(key, list(all_questions), all_questions)
+    return index_sheets(all_questions, file_path, index)